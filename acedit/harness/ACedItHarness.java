@@ -0,0 +1,122 @@
+// Runs a compiled Java solution against several test cases inside a single JVM.
+// Usage: java ACedItHarness <class directory> <class name> <commands file> <reports file>
+// The harness is controlled through the commands and reports files, which
+// are pipes of their own, so that nothing the solution writes to the JVM's
+// stdout can be taken for a report.
+// "ready" is reported once the harness can run cases, or "unsupported" if
+// System.exit cannot be trapped by this JVM. Each line of commands then
+// names an input, an output and an error file. The solution's main is
+// invoked from a fresh class loader with System.in, System.out and
+// System.err redirected to them, and
+// "<exit status> <wall ns> <cpu ns> <peak heap bytes>" is reported back
+
+import java.io.*;
+import java.lang.management.*;
+import java.lang.reflect.*;
+import java.net.*;
+import java.security.Permission;
+
+public class ACedItHarness {
+
+    static class ExitTrap extends SecurityException {
+        final int status;
+
+        ExitTrap(int status) {
+            this.status = status;
+        }
+    }
+
+    @SuppressWarnings("removal")
+    static boolean trapExit() {
+        try {
+            System.setSecurityManager(new SecurityManager() {
+                public void checkPermission(Permission perm) {}
+                public void checkPermission(Permission perm, Object context) {}
+                public void checkExit(int status) {
+                    throw new ExitTrap(status);
+                }
+            });
+            return true;
+        } catch (Throwable e) {
+            // Not supported since Java 24, System.exit would end the harness
+            return false;
+        }
+    }
+
+    public static void main(String[] args) throws Exception {
+        URL[] classpath = {new File(args[0]).toURI().toURL()};
+        PrintStream stdout = System.out, stderr = System.err;
+        InputStream stdin = System.in;
+        BufferedReader commands = new BufferedReader(new InputStreamReader(new FileInputStream(args[2]), "UTF-8"));
+        PrintStream control = new PrintStream(new FileOutputStream(args[3]), false, "UTF-8");
+
+        ThreadMXBean threads = ManagementFactory.getThreadMXBean();
+        java.util.List<MemoryPoolMXBean> pools = ManagementFactory.getMemoryPoolMXBeans();
+
+        if (!trapExit()) {
+            control.println("unsupported");
+            control.flush();
+            return;
+        }
+        control.println("ready");
+        control.flush();
+
+        String line;
+        while ((line = commands.readLine()) != null) {
+            String[] paths = line.split("\t");
+            int status = 0;
+            long start = System.nanoTime(), cpuStart = threads.getCurrentThreadCpuTime();
+            long peak = 0;
+
+            // Leave garbage from the previous case out of this one's peak
+            System.gc();
+            for (MemoryPoolMXBean pool : pools) {
+                if (pool.getType() == MemoryType.HEAP) {
+                    pool.resetPeakUsage();
+                }
+            }
+
+            URLClassLoader loader = new URLClassLoader(classpath);
+            try (InputStream in = new BufferedInputStream(new FileInputStream(paths[0]));
+                 PrintStream out = new PrintStream(new BufferedOutputStream(new FileOutputStream(paths[1]), 1 << 16));
+                 PrintStream err = new PrintStream(new FileOutputStream(paths[2]), true)) {
+                System.setIn(in);
+                System.setOut(out);
+                System.setErr(err);
+                start = System.nanoTime();
+                cpuStart = threads.getCurrentThreadCpuTime();
+                try {
+                    Method main = Class.forName(args[1], true, loader).getMethod("main", String[].class);
+                    main.invoke(null, (Object) new String[0]);
+                } catch (InvocationTargetException e) {
+                    Throwable cause = e.getCause();
+                    if (cause instanceof ExitTrap) {
+                        status = ((ExitTrap) cause).status;
+                    } else {
+                        cause.printStackTrace();
+                        status = 1;
+                    }
+                } catch (ExitTrap e) {
+                    status = e.status;
+                } catch (Throwable e) {
+                    e.printStackTrace();
+                    status = 1;
+                }
+                out.flush();
+            } finally {
+                System.setIn(stdin);
+                System.setOut(stdout);
+                System.setErr(stderr);
+                loader.close();
+            }
+            long wall = System.nanoTime() - start, cpu = threads.getCurrentThreadCpuTime() - cpuStart;
+            for (MemoryPoolMXBean pool : pools) {
+                if (pool.getType() == MemoryType.HEAP) {
+                    peak += pool.getPeakUsage().getUsed();
+                }
+            }
+            control.println(status + " " + wall + " " + cpu + " " + peak);
+            control.flush();
+        }
+    }
+}
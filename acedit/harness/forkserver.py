@@ -0,0 +1,114 @@
+# Runs a Python solution against several test cases by forking this
+# interpreter, which has already compiled the solution and loaded its imports.
+# Usage: python forkserver.py <solution>
+# Each line on stdin holds an input file, an output file, an error file, a
+# time limit and a memory limit. A child is forked per line with stdin,
+# stdout and stderr redirected to them, and
+# "<wait status> <wall seconds> <cpu seconds> <peak rss bytes>" is reported
+# back, with -1 for anything that could not be measured
+
+import ast
+import os
+import resource
+import signal
+import sys
+import time
+import traceback
+
+
+def preload(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            try:
+                __import__(name)
+            except Exception:
+                pass
+
+
+def limit_address_space(memory_limit):
+    # Leave room for what the server had already mapped before forking
+    try:
+        with open('/proc/self/status') as f:
+            size = int(f.read().split('VmSize:')[1].split()[0]) * 1024
+    except (IOError, OSError, IndexError, ValueError):
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (size + memory_limit, size + memory_limit))
+
+
+def run(code, path, input_file, output_file, error_file, time_limit, memory_limit):
+    status = 0
+    try:
+        for name, fd, flags in [(input_file, 0, os.O_RDONLY),
+                                (output_file, 1, os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+                                (error_file, 2, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)]:
+            opened = os.open(name, flags, 0o644)
+            os.dup2(opened, fd)
+            os.close(opened)
+        sys.stdin = os.fdopen(0, 'r')
+        sys.stdout = os.fdopen(1, 'w')
+        sys.stderr = os.fdopen(2, 'w')
+        sys.argv = [path]
+        limit_address_space(memory_limit)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+        exec(code, {'__name__': '__main__', '__file__': path, '__builtins__': __builtins__})
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            status = e.code or 0
+        else:
+            sys.stderr.write('%s\n' % e.code)
+            status = 1
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+
+    threading = sys.modules.get('threading')
+    if threading is not None:
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and not thread.daemon:
+                thread.join()
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        status = status or 1
+    os._exit(status)
+
+
+def main():
+    path = sys.argv[1]
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    code = compile(tree, path, 'exec')
+    preload(tree)
+
+    control = os.fdopen(os.dup(1), 'w')
+    commands = os.fdopen(os.dup(0), 'r')
+    control.write('ready\n')
+    control.flush()
+
+    while True:
+        line = commands.readline()
+        if not line:
+            break
+        input_file, output_file, error_file, time_limit, memory_limit = line.rstrip('\n').split('\t')
+        start = time.time()
+        pid = os.fork()
+        if pid == 0:
+            control.close()
+            commands.close()
+            run(code, path, input_file, output_file, error_file, float(time_limit), int(memory_limit))
+        _, status, usage = os.wait4(pid, 0)
+        rss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        control.write('%d %f %f %d\n' % (status, time.time() - start,
+                                         usage.ru_utime + usage.ru_stime, rss))
+        control.flush()
+
+
+main()
@@ -0,0 +1,73 @@
+# Runs a Ruby solution against several test cases by forking this
+# interpreter, which has already compiled the solution and loaded its requires.
+# Usage: ruby forkserver.rb <solution>
+# Each line on stdin holds an input file, an output file, an error file, a
+# time limit and a memory limit. A child is forked per line with stdin,
+# stdout and stderr redirected to them, and
+# "<wait status> <wall seconds> <cpu seconds> <peak rss bytes>" is reported
+# back, with -1 for anything that could not be measured
+
+path = ARGV.shift
+source = File.read(path)
+iseq = defined?(RubyVM::InstructionSequence) ? RubyVM::InstructionSequence.compile(source, path, path) : nil
+
+source.scan(/^\s*require\s+['"]([^'"]+)['"]/) do |name,|
+  begin
+    require name
+  rescue LoadError
+  end
+end
+
+control = STDOUT.dup
+control.sync = true
+control.puts 'ready'
+
+while (line = STDIN.gets)
+  input_file, output_file, error_file, time_limit, memory_limit = line.chomp.split("\t")
+  start = Process.clock_gettime(Process::CLOCK_MONOTONIC)
+  times = Process.times
+  reader, writer = IO.pipe
+  pid = fork do
+    control.close
+    reader.close
+    STDIN.reopen(input_file, 'r')
+    STDOUT.reopen(output_file, 'w')
+    STDERR.reopen(error_file, 'w')
+    $stdin, $stdout, $stderr = STDIN, STDOUT, STDERR
+    trap('ALRM', 'SYSTEM_DEFAULT')
+    Thread.new do
+      sleep time_limit.to_f
+      Process.kill('ALRM', Process.pid)
+    end
+    begin
+      # Leave room for what the server had already mapped before forking
+      size = File.read('/proc/self/status')[/VmSize:\s*(\d+)/, 1].to_i * 1024
+      Process.setrlimit(:AS, size + memory_limit.to_i)
+    rescue StandardError
+    end
+    status = 0
+    begin
+      iseq ? iseq.eval : TOPLEVEL_BINDING.eval(source, path)
+    rescue SystemExit => e
+      status = e.status
+    rescue Exception => e
+      STDERR.puts "#{e.class}: #{e.message}"
+      STDERR.puts e.backtrace
+      status = 1
+    end
+    STDOUT.flush
+    STDERR.flush
+    begin
+      writer.puts(File.read('/proc/self/status')[/VmHWM:\s*(\d+)/, 1].to_i * 1024)
+    rescue StandardError
+    end
+    exit!(status)
+  end
+  writer.close
+  Process.wait(pid)
+  elapsed = Process.clock_gettime(Process::CLOCK_MONOTONIC) - start
+  cpu = Process.times.cutime + Process.times.cstime - times.cutime - times.cstime
+  rss = reader.read.to_i
+  reader.close
+  control.puts "#{$?.to_i} #{elapsed} #{cpu} #{rss > 0 ? rss : -1}"
+end
@@ -0,0 +1,85 @@
+/*
+ * Starts a solution, applies its limits and reports its resource usage.
+ * Usage: launcher <report fd> <time limit> <address space limit or 0> <command...>
+ * Writes "<wait status> <wall seconds> <cpu seconds> <peak rss bytes>" to the report fd
+ */
+
+#include <errno.h>
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/resource.h>
+#include <sys/time.h>
+#include <sys/wait.h>
+#include <time.h>
+#include <unistd.h>
+#ifdef __linux__
+#include <sys/prctl.h>
+#endif
+
+static pid_t child;
+
+static void on_alarm(int sig) {
+    kill(child, SIGKILL);
+}
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec / 1e9;
+}
+
+int main(int argc, char **argv) {
+    int report_fd = atoi(argv[1]);
+    double time_limit = atof(argv[2]);
+    long long address_limit = atoll(argv[3]);
+    FILE *report = fdopen(report_fd, "w");
+    double start = now();
+    struct sigaction action;
+    struct itimerval timer;
+    struct rusage usage;
+    int status;
+    long rss;
+
+    child = fork();
+    if (child == 0) {
+#ifdef __linux__
+        prctl(PR_SET_PDEATHSIG, SIGKILL);
+#endif
+        close(report_fd);
+        if (address_limit > 0) {
+            struct rlimit limit = {(rlim_t) address_limit, (rlim_t) address_limit};
+            setrlimit(RLIMIT_AS, &limit);
+        }
+        execvp(argv[4], argv + 4);
+        perror(argv[4]);
+        _exit(127);
+    }
+    if (child < 0) {
+        perror("fork");
+        return 1;
+    }
+
+    memset(&action, 0, sizeof action);
+    action.sa_handler = on_alarm;
+    sigaction(SIGALRM, &action, NULL);
+    memset(&timer, 0, sizeof timer);
+    timer.it_value.tv_sec = (long) time_limit;
+    timer.it_value.tv_usec = (long) ((time_limit - (long) time_limit) * 1e6);
+    setitimer(ITIMER_REAL, &timer, NULL);
+
+    while (wait4(child, &status, 0, &usage) < 0 && errno == EINTR) {
+    }
+
+#ifdef __APPLE__
+    rss = usage.ru_maxrss;
+#else
+    rss = usage.ru_maxrss * 1024L;
+#endif
+    fprintf(report, "%d %f %f %ld\n", status, now() - start,
+            usage.ru_utime.tv_sec + usage.ru_utime.tv_usec / 1e6 +
+            usage.ru_stime.tv_sec + usage.ru_stime.tv_usec / 1e6, rss);
+    fclose(report);
+    return 0;
+}
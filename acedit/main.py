@@ -13,13 +13,22 @@ def validate_args(args):
     if args['default_site'] is not None or args['default_contest'] is not None:
         return
 
-    if args['clear_cache']:
+    if args['clear_cache'] or args['list_cache'] or args['cache_stats'] or args['pack_cache']:
         return
 
     if not args['site'] == 'spoj' and args['contest'] is None:
         print('Please specify contest code or set a default contest.')
         sys.exit(0)
 
+    if args['stress'] and not (args['gen'] and args['brute'] and args['source']):
+        print('Please specify a generator with --gen, a brute force solution with --brute '
+              'and your solution with --run.')
+        sys.exit(0)
+
+    if (args['checker'] or args['interactor'] or args['bench']) and not args['source']:
+        print('Please specify a solution to run with --run.')
+        sys.exit(0)
+
     if args['source']:
         return
 
@@ -33,6 +42,8 @@ def main():
     validate_args(args)
 
     try:
+        util.Utilities.open_archive(args)
+
         if args['default_site']:
             # set default site
             util.Utilities.set_constants('default_site', args['default_site'])
@@ -45,6 +56,22 @@ def main():
             # clear cached test cases
             util.Utilities.clear_cache(args['site'])
 
+        elif args['list_cache']:
+            # list cached test cases
+            util.Utilities.list_cache()
+
+        elif args['cache_stats']:
+            # show cache usage
+            util.Utilities.cache_stats()
+
+        elif args['pack_cache']:
+            # pack cached test cases
+            util.Utilities.pack_cache()
+
+        elif args['stress']:
+            # stress test code
+            util.Utilities.stress_test(args)
+
         elif args['source']:
             # run code
             util.Utilities.run_solution(args)
@@ -65,6 +92,9 @@ def main():
         util.Utilities.handle_kbd_interrupt(
             args['site'], args['contest'], args['problem'])
 
+    finally:
+        util.Utilities.close_archive()
+
 
 if __name__ == '__main__':
     main()
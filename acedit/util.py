@@ -1,14 +1,46 @@
 # coding: utf-8
 import sys
+import asyncio
+import contextlib
+import errno
 import json
 import re
 import os
 import functools
+import gzip
+import hashlib
+import html
+import io
+import itertools
+import math
+import mmap
+import multiprocessing
+import pkgutil
 import platform
+import queue
+import random
+import resource
+import shutil
+import signal
+import sqlite3
+import statistics
+import struct
+import subprocess
+import tempfile
 import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
 try:
     from bs4 import BeautifulSoup as bs
     import requests as rq
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     from argparse import ArgumentParser
 except:
     err = """
@@ -18,6 +50,12 @@ except:
     print(err)
     sys.exit(0)
 
+try:
+    import aiohttp
+except ImportError:
+    # Only needed for the asyncio engine
+    aiohttp = None
+
 
 class Utilities:
 
@@ -30,6 +68,41 @@ class Utilities:
         'BOLD': '\033[1m',
     }
 
+    token_pattern = re.compile(rb'\S+')
+
+    # Compiler flags taken from http://codeforces.com/blog/entry/79
+    compilers = {
+        'hs': ['ghc', '--make', '-O', '-dynamic'],
+        'c': ['/usr/local/bin/gcc-9', '-DONLINE_JUDGE', '-fno-asm', '-lm', '-O2'],
+        'cpp': ['/usr/local/bin/g++-9', '-DONLINE_JUDGE', '-lm', '-x', 'c++', '-O2', '-std=c++14'],
+        'java': ['javac'],
+    }
+
+    java_flags = ['-DONLINE_JUDGE=true', '-Duser.language=en',
+                  '-Duser.region=US', '-Duser.variant=US']
+
+    # Responses worth retrying, with exponential backoff
+    retry_statuses = [429, 500, 502, 503, 504]
+
+    # One connection pool and one rate limiter per host, shared by all requests to it
+    sessions = {}
+    rate_limiters = {}
+    sessions_lock = threading.Lock()
+
+    # Archive that responses are recorded to or replayed from, if any
+    archive = None
+
+    # Index of the cached problems, opened on first use
+    index = None
+    index_lock = threading.Lock()
+
+    # When this run started. Problems used since then are not evicted
+    started = time.time()
+
+    # Messages printed by the supported runtimes when an allocation fails
+    memory_errors = ['std::bad_alloc', 'MemoryError', 'NoMemoryError', 'failed to allocate memory',
+                     'OutOfMemoryError', 'out of memory', 'heap overflow', 'Cannot allocate memory']
+
     @staticmethod
     def parse_flags(supported_sites):
         """
@@ -74,7 +147,138 @@ class Utilities:
                             action='store_true',
                             help='Clear cached test cases for a given site. Takes default site if -s flag is omitted')
 
-        parser.set_defaults(force=False, clear_cache=False)
+        parser.add_argument('--list-cache',
+                            dest='list_cache',
+                            action='store_true',
+                            help='List the problems whose test cases are cached')
+
+        parser.add_argument('--cache-stats',
+                            dest='cache_stats',
+                            action='store_true',
+                            help='Show the size, hit rate and evictions of the test case cache per site')
+
+        parser.add_argument('--pack-cache',
+                            dest='pack_cache',
+                            action='store_true',
+                            help='Pack the test cases of every cached problem into a single file, and pack new ones too')
+
+        parser.add_argument('-j', '--jobs',
+                            dest='jobs',
+                            type=int,
+                            help='Number of test cases to run in parallel. Defaults to the number of cores')
+
+        parser.add_argument('--warm-jvm',
+                            dest='warm_jvm',
+                            action='store_true',
+                            help='Run all test cases of a Java solution inside a single long-lived JVM')
+
+        parser.add_argument('--fork-server',
+                            dest='fork_server',
+                            action='store_true',
+                            help='Run Python and Ruby solutions by forking a pre-started interpreter for each test case')
+
+        parser.add_argument('--interpreter',
+                            dest='interpreter',
+                            help='Interpreter for Python solutions, e.g. python3 or pypy3')
+
+        parser.add_argument('--memory-limit',
+                            dest='memory_limit',
+                            type=int,
+                            help='Memory limit in megabytes for each test case. Defaults to the problem\'s limit, or 256')
+
+        parser.add_argument('--time-scale',
+                            dest='time_scale',
+                            type=float,
+                            help='Factor to scale the time limit of the problem by, to account for the speed of this machine')
+
+        parser.add_argument('--abs-error',
+                            dest='abs_error',
+                            type=float,
+                            help='Absolute error allowed when comparing numbers in the output')
+
+        parser.add_argument('--rel-error',
+                            dest='rel_error',
+                            type=float,
+                            help='Relative error allowed when comparing numbers in the output')
+
+        parser.add_argument('--checker',
+                            dest='checker',
+                            help='Source of a testlib style checker to verify outputs with, '
+                                 'run as: checker input output expected_output')
+
+        parser.add_argument('--interactor',
+                            dest='interactor',
+                            help='Source of a testlib style interactor to run interactive problems with, '
+                                 'run as: interactor input output')
+
+        parser.add_argument('--stress',
+                            dest='stress',
+                            action='store_true',
+                            help='Compare the solution given with --run against a brute force solution '
+                                 'on generated inputs, until their outputs differ')
+
+        parser.add_argument('--gen',
+                            dest='gen',
+                            help='Source of the generator for --stress, run with a seed as its argument')
+
+        parser.add_argument('--brute',
+                            dest='brute',
+                            help='Source of the brute force solution for --stress')
+
+        parser.add_argument('--iterations',
+                            dest='iterations',
+                            type=int,
+                            help='Number of inputs to generate for --stress')
+
+        parser.add_argument('--bench',
+                            dest='bench',
+                            type=int,
+                            metavar='RUNS',
+                            help='Time the solution given with --run over RUNS runs of every test case')
+
+        parser.add_argument('--warmup',
+                            dest='warmup',
+                            type=int,
+                            help='Number of runs of every test case before timing it with --bench. Defaults to 1')
+
+        parser.add_argument('--bench-output',
+                            dest='bench_output',
+                            help='File to save the timings of --bench to as JSON')
+
+        parser.add_argument('--bench-compare',
+                            dest='bench_compare',
+                            help='Timings saved with --bench-output to compare against')
+
+        parser.add_argument('--engine',
+                            dest='engine',
+                            choices=['threads', 'asyncio'],
+                            help='Engine to download problem pages with. asyncio needs aiohttp')
+
+        archive = parser.add_mutually_exclusive_group()
+        archive.add_argument('--record',
+                             dest='record',
+                             metavar='ARCHIVE',
+                             help='Record all responses downloaded from the site to an archive')
+
+        archive.add_argument('--replay',
+                             dest='replay',
+                             metavar='ARCHIVE',
+                             help='Serve all responses from an archive made with --record, instead of the site')
+
+        parser.add_argument('--replay-latency',
+                            dest='replay_latency',
+                            type=float,
+                            help='Seconds to delay each replayed response by')
+
+        parser.add_argument('--replay-error-rate',
+                            dest='replay_error_rate',
+                            type=float,
+                            help='Fraction of replayed responses to fail with 503, e.g. 0.1')
+
+        parser.set_defaults(force=False, clear_cache=False, list_cache=False, cache_stats=False,
+                            pack_cache=False, warm_jvm=False, stress=False, iterations=1000, warmup=1,
+                            fork_server=False, interpreter='python', engine='threads',
+                            replay_latency=0, replay_error_rate=0)
 
         args = parser.parse_args()
 
@@ -103,9 +307,35 @@ class Utilities:
         flags['problem'] = args.problem
         flags['force'] = args.force
         flags['clear_cache'] = args.clear_cache
+        flags['list_cache'] = args.list_cache
+        flags['cache_stats'] = args.cache_stats
+        flags['pack_cache'] = args.pack_cache
         flags['source'] = args.source_file
         flags['default_site'] = args.default_site
         flags['default_contest'] = args.default_contest
+        flags['jobs'] = args.jobs
+        flags['warm_jvm'] = args.warm_jvm
+        flags['fork_server'] = args.fork_server
+        flags['interpreter'] = args.interpreter
+        flags['memory_limit'] = args.memory_limit
+        flags['time_scale'] = args.time_scale
+        flags['abs_error'] = args.abs_error
+        flags['rel_error'] = args.rel_error
+        flags['checker'] = args.checker
+        flags['interactor'] = args.interactor
+        flags['stress'] = args.stress
+        flags['gen'] = args.gen
+        flags['brute'] = args.brute
+        flags['iterations'] = args.iterations
+        flags['bench'] = args.bench
+        flags['warmup'] = args.warmup
+        flags['bench_output'] = args.bench_output
+        flags['bench_compare'] = args.bench_compare
+        flags['engine'] = args.engine
+        flags['record'] = args.record
+        flags['replay'] = args.replay
+        flags['replay_latency'] = args.replay_latency
+        flags['replay_error_rate'] = args.replay_error_rate
 
         return flags
 
@@ -124,6 +354,20 @@ class Utilities:
 
         print('Set %s to %s' % (key, value))
 
+    @staticmethod
+    def get_constant(key, default=None):
+        """
+        Utility method to read a value from constants.json
+        """
+        try:
+            with open(os.path.join(Utilities.cache_dir, 'constants.json'), 'r') as f:
+                data = json.loads(f.read())
+        except (IOError, ValueError):
+            return default
+
+        value = data.get(key)
+        return default if value is None else value
+
     @staticmethod
     def check_cache(site, contest, problem):
         """
@@ -136,15 +380,317 @@ class Utilities:
                 os.makedirs(os.path.join(Utilities.cache_dir, site, contest))
             return False
 
+        if Utilities.has_testcases(site, contest, problem):
+            return True
+
         # Handle case for SPOJ specially as it does not have contests
         contest = '' if site == 'spoj' else contest
 
-        if os.path.isdir(os.path.join(Utilities.cache_dir, site, contest, problem)):
-            return True
-        else:
+        # A directory without an index entry is left behind by an interrupted download
+        if not os.path.isdir(os.path.join(Utilities.cache_dir, site, contest, problem)):
             os.makedirs(os.path.join(Utilities.cache_dir, site,
                                      contest, problem))
-            return False
+        return False
+
+    @staticmethod
+    def has_testcases(site, contest, problem):
+        """
+        Method to check if test cases of a problem are stored in cache
+        """
+        return Utilities.get_cached_problem(site, contest, problem) is not None
+
+    @staticmethod
+    def get_index():
+        """
+        Method to get the index of the cached problems
+        """
+        with Utilities.index_lock:
+            if Utilities.index is None:
+                if not os.path.isdir(Utilities.cache_dir):
+                    os.makedirs(Utilities.cache_dir)
+                index = sqlite3.connect(os.path.join(Utilities.cache_dir, 'index.sqlite'),
+                                        check_same_thread=False)
+                index.row_factory = sqlite3.Row
+                index.execute('''CREATE TABLE IF NOT EXISTS problems (
+                                     site TEXT NOT NULL,
+                                     contest TEXT NOT NULL,
+                                     problem TEXT NOT NULL,
+                                     cases INTEGER NOT NULL,
+                                     bytes INTEGER NOT NULL,
+                                     hash TEXT NOT NULL,
+                                     fetched REAL NOT NULL,
+                                     time_limit REAL,
+                                     memory_limit INTEGER,
+                                     PRIMARY KEY (site, contest, problem))''')
+                index.execute('''CREATE TABLE IF NOT EXISTS cache_stats (
+                                     site TEXT PRIMARY KEY,
+                                     hits INTEGER NOT NULL DEFAULT 0,
+                                     misses INTEGER NOT NULL DEFAULT 0,
+                                     evictions INTEGER NOT NULL DEFAULT 0,
+                                     evicted_bytes INTEGER NOT NULL DEFAULT 0)''')
+
+                # Columns added since the index was introduced
+                columns = [row[1] for row in index.execute('PRAGMA table_info(problems)')]
+                for column in ['stored_bytes INTEGER NOT NULL DEFAULT 0',
+                               'accessed REAL NOT NULL DEFAULT 0',
+                               'response TEXT',
+                               'response_bytes INTEGER NOT NULL DEFAULT 0',
+                               'mtime REAL NOT NULL DEFAULT 0']:
+                    if column.split()[0] not in columns:
+                        index.execute('ALTER TABLE problems ADD COLUMN ' + column)
+
+                if 'stored_bytes' not in columns:
+                    for row in index.execute('SELECT site, contest, problem FROM problems').fetchall():
+                        index.execute('UPDATE problems SET stored_bytes = ? '
+                                      'WHERE site = ? AND contest = ? AND problem = ?',
+                                      (Utilities.get_stored_size(*row),) + tuple(row))
+
+                index.commit()
+                Utilities.index = index
+
+            return Utilities.index
+
+    @staticmethod
+    def index_problem(site, contest, problem, inputs, outputs, limits=None, fetched=None):
+        """
+        Method to record the test cases of a problem in the index
+        """
+        contest = '' if site == 'spoj' else contest
+        limits = limits or {}
+
+        key = hashlib.sha256()
+        size = 0
+        for case in inputs + outputs:
+            data = case.encode('utf-8')
+            key.update(str(len(data)).encode('utf-8') + b'\0' + data)
+            size += len(data)
+
+        stored_size = Utilities.get_stored_size(site, contest, problem)
+        # Changed when cases are added to or removed from the directory
+        path = os.path.join(Utilities.cache_dir, site, contest, problem)
+        mtime = os.path.getmtime(path) if os.path.isdir(path) else 0
+
+        index = Utilities.get_index()
+        with Utilities.index_lock, index:
+            # The cached response of the problem is kept when it is stored again
+            index.execute('''INSERT OR REPLACE INTO problems
+                                 (site, contest, problem, cases, bytes, hash, fetched,
+                                  time_limit, memory_limit, stored_bytes, accessed,
+                                  response, response_bytes, mtime)
+                             SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                                    MAX(response), COALESCE(MAX(response_bytes), 0), ?
+                             FROM problems WHERE site = ? AND contest = ? AND problem = ?''',
+                          (site, contest, problem, len(inputs), size, key.hexdigest(),
+                           fetched or time.time(), limits.get('time_limit'), limits.get('memory_limit'),
+                           stored_size, time.time(), mtime, site, contest, problem))
+
+    @staticmethod
+    def get_cached_problem(site, contest, problem):
+        """
+        Method to get the index entry of a cached problem
+        Problems cached before the index existed, and problems whose cases
+        were added or removed since they were indexed, are indexed again
+        Returns None if the problem is not cached
+        """
+        contest = '' if site == 'spoj' else contest
+        path = os.path.join(Utilities.cache_dir, site, contest, problem)
+        query = 'SELECT * FROM problems WHERE site = ? AND contest = ? AND problem = ?'
+
+        index = Utilities.get_index()
+        with Utilities.index_lock:
+            row = index.execute(query, (site, contest, problem)).fetchone()
+
+        mtime = os.path.getmtime(path) if os.path.isdir(path) else None
+        if row is not None and row['mtime'] == mtime:
+            return row
+
+        inputs, outputs = Utilities.load_cases(path) if mtime is not None else ([], [])
+        num_cases = min(len(inputs), len(outputs))
+        if num_cases == 0:
+            # The cached response goes as well, so that the page is not
+            # revalidated against test cases which are gone
+            if row is not None:
+                Utilities.remove_from_index(site, contest, problem)
+            return None
+
+        Utilities.index_problem(site, contest, problem, inputs[:num_cases], outputs[:num_cases],
+                                Utilities.get_limits(path), row['fetched'] if row is not None else mtime)
+        with Utilities.index_lock:
+            return index.execute(query, (site, contest, problem)).fetchone()
+
+    @staticmethod
+    def get_stored_size(site, contest, problem):
+        """
+        Method to get the size of a cached problem on disk, after compression
+        """
+        path = os.path.join(Utilities.cache_dir, site, contest, problem)
+        if not os.path.isdir(path):
+            return 0
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+    @staticmethod
+    def record_lookup(site, contest, problem, hit):
+        """
+        Method to count a lookup of a problem in the cache towards its hit
+        rate, and to mark the problem as used if it was found
+        """
+        contest = '' if site == 'spoj' else contest
+
+        index = Utilities.get_index()
+        with Utilities.index_lock, index:
+            if hit:
+                index.execute('UPDATE problems SET accessed = ? WHERE site = ? AND contest = ? AND problem = ?',
+                              (time.time(), site, contest, problem))
+            column = 'hits' if hit else 'misses'
+            index.execute('INSERT OR IGNORE INTO cache_stats (site) VALUES (?)', (site,))
+            index.execute('UPDATE cache_stats SET %s = %s + 1 WHERE site = ?' % (column, column), (site,))
+
+    @staticmethod
+    def evict_cache():
+        """
+        Method to remove least recently used problems until the cached test
+        cases and downloaded pages fit within cache_size megabytes
+        Problems used by this run are kept, and contests left empty are removed
+        """
+        limit = int(Utilities.get_constant('cache_size', 1024)) * 1024 * 1024
+
+        index = Utilities.get_index()
+        with Utilities.index_lock:
+            rows = index.execute('SELECT site, contest, problem, stored_bytes, accessed, '
+                                 'response, response_bytes FROM problems ORDER BY accessed').fetchall()
+
+        orphans = Utilities.get_orphan_responses(row['response'] for row in rows)
+        total = sum(row['stored_bytes'] + row['response_bytes'] for row in rows) + \
+            sum(size for _, size in orphans)
+        evicted = 0
+
+        # Responses of problems no longer cached are of no use, and go first
+        for name, size in orphans:
+            if total <= limit:
+                break
+            Utilities.remove_response(name)
+            total -= size
+
+        for row in rows:
+            if total <= limit or row['accessed'] >= Utilities.started:
+                break
+
+            contest_path = os.path.join(Utilities.cache_dir, row['site'], row['contest'])
+            shutil.rmtree(os.path.join(contest_path, row['problem']), ignore_errors=True)
+            if row['contest'] and os.path.isdir(contest_path) and len(os.listdir(contest_path)) == 0:
+                os.rmdir(contest_path)
+            Utilities.remove_response(row['response'])
+            size = row['stored_bytes'] + row['response_bytes']
+
+            with Utilities.index_lock, index:
+                index.execute('DELETE FROM problems WHERE site = ? AND contest = ? AND problem = ?',
+                              (row['site'], row['contest'], row['problem']))
+                index.execute('INSERT OR IGNORE INTO cache_stats (site) VALUES (?)', (row['site'],))
+                index.execute('UPDATE cache_stats SET evictions = evictions + 1, '
+                              'evicted_bytes = evicted_bytes + ? WHERE site = ?',
+                              (size, row['site']))
+
+            total -= size
+            evicted += 1
+
+        if evicted > 0:
+            print('Removed %d least recently used problems from the cache, to keep it within %s.' % (
+                evicted, Utilities.format_size(limit)))
+
+    @staticmethod
+    def cache_stats():
+        """
+        Method to show the size, hit rate and evictions of the cache per site
+        """
+        index = Utilities.get_index()
+        with Utilities.index_lock:
+            sizes = dict((row['site'], row) for row in index.execute(
+                'SELECT site, COUNT(*) AS problems, SUM(stored_bytes) AS size, '
+                'SUM(response_bytes) AS pages FROM problems GROUP BY site'))
+            stats = dict((row['site'], row) for row in index.execute('SELECT * FROM cache_stats'))
+            responses = [row['response'] for row in index.execute('SELECT response FROM problems')]
+
+        print('%-12s %8s %10s %10s %8s %8s %9s %10s %10s' % (
+            'Site', 'Problems', 'Size', 'Pages', 'Hits', 'Misses', 'Hit rate', 'Evictions', 'Evicted'))
+
+        totals = [0] * 7
+        for site in sorted(set(sizes) | set(stats)):
+            row = [sizes[site][key] if site in sizes else 0 for key in ['problems', 'size', 'pages']] + \
+                [stats[site][key] if site in stats else 0
+                 for key in ['hits', 'misses', 'evictions', 'evicted_bytes']]
+            totals = [total + value for total, value in zip(totals, row)]
+            Utilities.print_cache_stats(site, row)
+
+        # Pages of problems no longer cached count towards the total as well
+        totals[2] += sum(size for _, size in Utilities.get_orphan_responses(responses))
+
+        Utilities.print_cache_stats('Total', totals)
+        print('Using %s of %s' % (Utilities.format_size(totals[1] + totals[2]), Utilities.format_size(
+            int(Utilities.get_constant('cache_size', 1024)) * 1024 * 1024)))
+
+    @staticmethod
+    def print_cache_stats(site, row):
+        """
+        Method to print a row of the cache statistics
+        """
+        problems, size, pages, hits, misses, evictions, evicted_bytes = row
+        hit_rate = '%.1f%%' % (100.0 * hits / (hits + misses)) if hits + misses > 0 else '-'
+        print('%-12s %8d %10s %10s %8d %8d %9s %10d %10s' % (
+            site, problems, Utilities.format_size(size), Utilities.format_size(pages), hits, misses,
+            hit_rate, evictions, Utilities.format_size(evicted_bytes)))
+
+    @staticmethod
+    def remove_from_index(site, contest=None, problem=None):
+        """
+        Method to remove a site, a contest or a problem from the index
+        """
+        if contest is not None:
+            contest = '' if site == 'spoj' else contest
+
+        query, params = ' FROM problems WHERE site = ?', [site]
+        if contest is not None:
+            query, params = query + ' AND contest = ?', params + [contest]
+        if problem is not None:
+            query, params = query + ' AND problem = ?', params + [problem]
+
+        index = Utilities.get_index()
+        with Utilities.index_lock, index:
+            responses = [row['response'] for row in index.execute('SELECT response' + query, params)]
+            index.execute('DELETE' + query, params)
+
+        for response in responses:
+            Utilities.remove_response(response)
+
+    @staticmethod
+    def list_cache():
+        """
+        Method to list the cached problems
+        """
+        index = Utilities.get_index()
+        with Utilities.index_lock:
+            rows = index.execute('SELECT * FROM problems ORDER BY site, contest, problem').fetchall()
+
+        if len(rows) == 0:
+            print('No test cases are cached.')
+            return
+
+        print('%-12s %-16s %-24s %6s %10s  %s' % ('Site', 'Contest', 'Problem', 'Cases', 'Size', 'Fetched'))
+        for row in rows:
+            print('%-12s %-16s %-24s %6d %10s  %s' % (
+                row['site'], row['contest'], row['problem'], row['cases'],
+                Utilities.format_size(row['bytes']),
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(row['fetched']))))
+
+    @staticmethod
+    def format_size(size):
+        """
+        Method to format a number of bytes for display
+        """
+        for unit in ['B', 'KB', 'MB']:
+            if size < 1024:
+                return '%d %s' % (size, unit) if unit == 'B' else '%.1f %s' % (size, unit)
+            size /= 1024.0
+        return '%.1f GB' % (size)
 
     @staticmethod
     def clear_cache(site):
@@ -162,285 +708,2754 @@ class Utilities:
                 print('Some error occured. Try again.')
                 return
             os.makedirs(os.path.join(Utilities.cache_dir, site))
+            Utilities.remove_from_index(site)
             print('Done.')
 
     @staticmethod
-    def store_files(site, contest, problem, inputs, outputs):
+    def store_files(site, contest, problem, inputs, outputs, limits=None):
         """
         Method to store the test cases in files
         """
 
         # Handle case for SPOJ specially as it does not have contests
         contest = '' if site == 'spoj' else contest
+        path = os.path.join(Utilities.cache_dir, site, contest, problem)
+
+        packed = Utilities.get_constant('cache_format', 'files') == 'packed'
+        threshold = Utilities.get_compress_threshold()
+
+        if packed:
+            CasePack.write(path, inputs, outputs, threshold)
+        else:
+            if os.path.isfile(os.path.join(path, CasePack.filename)):
+                os.remove(os.path.join(path, CasePack.filename))
+
+            for i, inp in enumerate(inputs):
+                filename = os.path.join(
+                    Utilities.cache_dir, site, contest, problem, 'Input' + str(i))
+                Utilities.write_case(filename, inp, threshold)
 
-        for i, inp in enumerate(inputs):
+            for i, out in enumerate(outputs):
+                filename = os.path.join(
+                    Utilities.cache_dir, site, contest, problem, 'Output' + str(i))
+                Utilities.write_case(filename, out, threshold)
+
+        if limits:
             filename = os.path.join(
-                Utilities.cache_dir, site, contest, problem, 'Input' + str(i))
+                Utilities.cache_dir, site, contest, problem, 'meta.json')
             with open(filename, 'w') as handler:
-                handler.write(inp)
+                handler.write(json.dumps(limits, indent=2))
 
-        for i, out in enumerate(outputs):
-            filename = os.path.join(
-                Utilities.cache_dir, site, contest, problem, 'Output' + str(i))
+        # Remove test cases dropped from the problem since it was last
+        # downloaded, and all single files of a packed problem
+        for filename in os.listdir(path):
+            match = re.match(r'(Input|Output)(\d+)(\.gz)?$', filename)
+            if match and (packed or int(match.group(2)) >= len(inputs if match.group(1) == 'Input' else outputs)):
+                os.remove(os.path.join(path, filename))
+
+        # Indexed last, so that only completely stored problems count as cached
+        Utilities.index_problem(site, contest, problem, inputs, outputs, limits)
+
+    @staticmethod
+    def get_compress_threshold():
+        """
+        Method to get the size in bytes from which test cases are gzipped
+        """
+        return int(Utilities.get_constant('compress_threshold', 64)) * 1024
+
+    @staticmethod
+    def encode_case(case, threshold):
+        """
+        Method to encode a test case for storage
+        Cases of threshold bytes or more are gzipped
+        Returns the encoded case, and whether it is compressed
+        """
+        data = case.encode('utf-8')
+        if len(data) >= threshold:
+            compressed = gzip.compress(data)
+            if len(compressed) < len(data):
+                return compressed, True
+        return data, False
+
+    @staticmethod
+    def write_case(filename, case, threshold):
+        """
+        Method to store a test case in a file, gzipped if it is large
+        """
+        data, compressed = Utilities.encode_case(case, threshold)
+
+        if compressed:
+            with open(filename + '.gz', 'wb') as handler:
+                handler.write(data)
+        else:
             with open(filename, 'w') as handler:
-                handler.write(out)
+                handler.write(case)
+
+        # The case may have been stored the other way before
+        stale = filename if compressed else filename + '.gz'
+        if os.path.isfile(stale):
+            os.remove(stale)
 
     @staticmethod
-    def download_problem_testcases(args):
+    def read_case(filename):
         """
-        Download test cases for a given problem
+        Method to read a test case stored by write_case
+        """
+        if os.path.isfile(filename + '.gz'):
+            with gzip.open(filename + '.gz', 'rt', encoding='utf-8') as handler:
+                return handler.read()
+
+        with open(filename, 'r') as handler:
+            return handler.read()
+
+    @staticmethod
+    def load_cases(path):
+        """
+        Method to read all test cases of a problem, packed or not
+        Returns the inputs and the outputs
+        """
+        pack = CasePack.open(path)
+        if pack is not None:
+            with pack:
+                return ([pack.read('Input', i) for i in range(pack.num_inputs)],
+                        [pack.read('Output', i) for i in range(pack.num_outputs)])
+
+        inputs, outputs = [], []
+        for kind, cases in [('Input', inputs), ('Output', outputs)]:
+            # Cases are numbered from 0, and end at the first one missing
+            filename = os.path.join(path, kind + str(len(cases)))
+            while os.path.isfile(filename) or os.path.isfile(filename + '.gz'):
+                cases += [Utilities.read_case(filename)]
+                filename = os.path.join(path, kind + str(len(cases)))
+
+        return inputs, outputs
+
+    @staticmethod
+    def pack_cache():
+        """
+        Method to pack the test cases of every cached problem, and to have
+        new problems stored packed as well
+        Packed problems are indexed again, with their new size on disk
+        """
+        Utilities.set_constants('cache_format', 'packed')
+
+        packed = 0
+        threshold = Utilities.get_compress_threshold()
+        for root, dirs, files in os.walk(Utilities.cache_dir):
+            if root == Utilities.cache_dir:
+                # Not test cases
+                dirs[:] = [name for name in dirs if name not in ['builds', 'harness', 'http']]
+            if 'Input0' not in files and 'Input0.gz' not in files:
+                continue
+
+            # Problems of SPOJ are stored without a contest
+            parts = os.path.relpath(root, Utilities.cache_dir).split(os.sep)
+            site, contest, problem = parts if len(parts) == 3 else (parts[0], '', parts[-1])
+            row = Utilities.get_cached_problem(site, contest, problem)
+
+            inputs, outputs = Utilities.load_cases(root)
+            CasePack.write(root, inputs, outputs, threshold)
+            for name in files:
+                if re.match(r'(Input|Output)\d+(\.gz)?$', name):
+                    os.remove(os.path.join(root, name))
+            Utilities.index_problem(site, contest, problem, inputs, outputs, Utilities.get_limits(root),
+                                    row['fetched'] if row is not None else None)
+            packed += 1
+
+        print('Packed %d problems.' % (packed))
+
+    @staticmethod
+    def get_limits(path):
+        """
+        Method to get the time and memory limits stored with the test cases
+        """
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r') as handler:
+                return json.loads(handler.read())
+        except (IOError, ValueError):
+            return {}
+
+    @staticmethod
+    def get_platform(args):
+        """
+        Method to get the platform object for the site in args
         """
         if args['site'] == 'codeforces':
-            platform = Codeforces(args)
+            return Codeforces(args)
         elif args['site'] == 'codechef':
-            platform = Codechef(args)
+            return Codechef(args)
         elif args['site'] == 'spoj':
-            platform = Spoj(args)
+            return Spoj(args)
         elif args['site'] == 'atcoder':
-            platform = AtCoder(args)
+            return AtCoder(args)
         else:
-            platform = Hackerrank(args)
+            return Hackerrank(args)
+
+    @staticmethod
+    def download_problem_testcases(args):
+        """
+        Download test cases for a given problem
+        """
+        platform = Utilities.get_platform(args)
 
         is_in_cache = Utilities.check_cache(
             platform.site, platform.contest, platform.problem)
+        Utilities.record_lookup(platform.site, platform.contest, platform.problem, is_in_cache)
 
         if not args['force'] and is_in_cache:
             print('Test cases found in cache...')
             sys.exit(0)
 
         platform.scrape_problem()
+        Utilities.evict_cache()
 
     @staticmethod
     def download_contest_testcases(args):
         """
         Download test cases for all problems in a given contest
         """
-        if args['site'] == 'codeforces':
-            platform = Codeforces(args)
-        elif args['site'] == 'codechef':
-            platform = Codechef(args)
-        elif args['site'] == 'hackerrank':
-            platform = Hackerrank(args)
-        elif args['site'] == 'atcoder':
-            platform = AtCoder(args)
+        platform = Utilities.get_platform(args)
 
         Utilities.check_cache(
             platform.site, platform.contest, platform.problem)
 
         platform.scrape_contest()
+        Utilities.evict_cache()
+
+    @staticmethod
+    @contextlib.contextmanager
+    def case_file(path, kind, i, pack=None):
+        """
+        Method to get a path the input or output of a test case can be read from
+        Packed and compressed cases are fed into a pipe as they are read
+        """
+        filename = os.path.join(path, kind + str(i))
+
+        if pack is None and not os.path.isfile(filename + '.gz'):
+            yield filename
+
+        elif pack is not None and kind == 'Input':
+            with pack.input_file(i) as input_file:
+                yield input_file
+
+        else:
+
+            def feed(fd):
+                for chunk in Utilities.case_chunks(path, kind, i, pack):
+                    Utilities.write_all(fd, chunk)
+
+            with Utilities.pipe_input(kind + str(i), feed) as case_file:
+                yield case_file
+
+    @staticmethod
+    @contextlib.contextmanager
+    def pipe_input(name, feed):
+        """
+        Method to get a path an input can be read from while it is produced,
+        without writing it to a file
+        feed is called from a thread with a named pipe at that path to write to
+        """
+        fifo_dir = tempfile.mkdtemp(prefix='acedit')
+        fifo = os.path.join(fifo_dir, name)
+        os.mkfifo(fifo, 0o600)
+
+        def run():
+            fd = os.open(fifo, os.O_WRONLY)
+            try:
+                feed(fd)
+            except BrokenPipeError:
+                # The solution exited without reading all of its input
+                pass
+            finally:
+                os.close(fd)
+
+        feeder = threading.Thread(target=run)
+        feeder.daemon = True
+        feeder.start()
+
+        try:
+            yield fifo
+        finally:
+            # The feeder waits for a reader if the input was never opened,
+            # and for the reader to go if it was not read to the end
+            while feeder.is_alive():
+                fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+                feeder.join(0.01)
+                os.close(fd)
+                feeder.join(0.01)
+            shutil.rmtree(fifo_dir, ignore_errors=True)
+
+    @staticmethod
+    def write_all(fd, data):
+        """
+        Method to write all of data into a file descriptor
+        """
+        with memoryview(data) as view:
+            while len(view) > 0:
+                view = view[os.write(fd, view):]
+
+    @staticmethod
+    def case_chunks(path, kind, i, pack=None):
+        """
+        Method to read the input or output of a test case in chunks of bytes
+        """
+        if pack is not None:
+            yield from pack.chunks(kind, i)
+            return
+
+        filename = os.path.join(path, kind + str(i))
+        if os.path.isfile(filename + '.gz'):
+            handler = gzip.open(filename + '.gz', 'rb')
+        else:
+            handler = open(filename, 'rb')
+
+        with handler:
+            yield from iter(lambda: handler.read(1 << 16), b'')
+
+    @staticmethod
+    def tokenize(chunks):
+        """
+        Method to split chunks of output into whitespace separated tokens
+        Yields the tokens of each chunk as a list, carrying the last token of
+        a chunk over to the next one when the chunk may have cut it
+        """
+        pending = b''
+        for chunk in chunks:
+            data = pending + chunk
+            tokens = data.split()
+            pending = tokens.pop() if tokens and not data[-1:].isspace() else b''
+            if tokens:
+                yield tokens
+
+        if pending:
+            yield [pending]
+
+    @staticmethod
+    def locate_token(chunks, index):
+        """
+        Method to find the line and column of the token at an index of an output
+        Returns None if the output has fewer tokens
+        """
+        line, line_start = 1, 0
+        # Offset of the start of data in the whole output
+        base = 0
+        pending = b''
+
+        for chunk in itertools.chain(chunks, [None]):
+            data = pending + chunk if chunk is not None else pending
+            tokens = data.split()
+            end = len(data)
+            if chunk is not None and tokens and not data[-1:].isspace():
+                # The last token may go on in the next chunk
+                end -= len(tokens.pop())
+
+            if index < len(tokens):
+                # Only the chunk holding the token is scanned token by token
+                match = next(itertools.islice(Utilities.token_pattern.finditer(data, 0, end), index, None))
+                newlines = data.count(b'\n', 0, match.start())
+                if newlines:
+                    line += newlines
+                    line_start = base + data.rfind(b'\n', 0, match.start()) + 1
+                return line, base + match.start() - line_start + 1
+
+            index -= len(tokens)
+            newlines = data.count(b'\n', 0, end)
+            if newlines:
+                line += newlines
+                line_start = base + data.rfind(b'\n', 0, end) + 1
+            base += end
+            pending = data[end:]
+
+        return None
+
+    @staticmethod
+    def tokens_match(expected, found, abs_error=None, rel_error=None):
+        """
+        Method to check if a token of the output matches the expected one,
+        allowing numbers to differ by the given absolute or relative error
+        """
+        if expected == found:
+            return True
+        if not abs_error and not rel_error:
+            return False
+
+        try:
+            return math.isclose(float(expected), float(found),
+                                abs_tol=abs_error or 0, rel_tol=rel_error or 0)
+        except ValueError:
+            return False
+
+    @staticmethod
+    def same_bytes(expected, found):
+        """
+        Method to check if two outputs are the same byte for byte, but for
+        whitespace after the end of one of them, without splitting them into tokens
+        Outputs with other whitespace differences may still have the same tokens
+        """
+        expected, found = iter(expected), iter(found)
+        expected_data = found_data = b''
+
+        while True:
+            if not expected_data:
+                expected_data = next(expected, None)
+            if not found_data:
+                found_data = next(found, None)
+            if expected_data is None or found_data is None:
+                break
+
+            count = min(len(expected_data), len(found_data))
+            if expected_data[:count] != found_data[:count]:
+                return False
+            expected_data, found_data = expected_data[count:], found_data[count:]
+
+        # Whatever is left of the longer output must be whitespace
+        rest, data = (found, found_data) if expected_data is None else (expected, expected_data)
+        return all(not chunk.strip() for chunk in itertools.chain([data or b''], rest))
+
+    @staticmethod
+    def compare_outputs(expected, found, abs_error=None, rel_error=None):
+        """
+        Method to compare an output with the expected one token by token,
+        stopping at the first difference
+        expected and found are functions returning the chunks of the outputs,
+        which are read again to find the line and column of a difference
+        Returns None if they match, and a description of the difference otherwise
+        """
+        def show(token):
+            token = token.decode('utf-8', errors='replace')
+            return token if len(token) <= 20 else token[:20] + '...'
+
+        if Utilities.same_bytes(expected(), found()):
+            return None
+
+        expected_chunks = Utilities.tokenize(expected())
+        found_chunks = Utilities.tokenize(found())
+        expected_tokens, found_tokens = [], []
+        # Index in the whole output of the first token of the lists
+        position = 0
+
+        while True:
+            if not expected_tokens:
+                expected_tokens = next(expected_chunks, None)
+            if not found_tokens:
+                found_tokens = next(found_chunks, None)
+
+            if expected_tokens is None and found_tokens is None:
+                return None
+
+            if found_tokens is None:
+                line, column = Utilities.locate_token(expected(), position)
+                return 'Line %d, column %d: expected %s, found end of output' % (
+                    line, column, show(expected_tokens[0]))
+
+            if expected_tokens is None:
+                line, column = Utilities.locate_token(found(), position)
+                return 'Line %d, column %d: expected end of output, found %s' % (
+                    line, column, show(found_tokens[0]))
+
+            # Tokens are compared in bulk, and one by one only where they differ
+            count = min(len(expected_tokens), len(found_tokens))
+            if expected_tokens[:count] != found_tokens[:count]:
+                for i in range(count):
+                    if not Utilities.tokens_match(expected_tokens[i], found_tokens[i], abs_error, rel_error):
+                        line, column = Utilities.locate_token(found(), position + i)
+                        return 'Line %d, column %d: expected %s, found %s' % (
+                            line, column, show(expected_tokens[i]), show(found_tokens[i]))
+
+            expected_tokens = expected_tokens[count:]
+            found_tokens = found_tokens[count:]
+            position += count
+
+    @staticmethod
+    def preview(chunks, size=None):
+        """
+        Method to get the start of an output to show in the results
+        """
+        size = size or int(float(Utilities.get_constant('preview_size', 4)) * 1024)
+        data = b''
+        for chunk in chunks:
+            data += chunk
+            if len(data) > size:
+                break
+
+        text = data[:size].decode('utf-8', errors='ignore').strip().split('\n')
+        text = '\n'.join([line.strip() for line in text])
+        return text + '\n...' if len(data) > size else text
 
     @staticmethod
     def input_file_to_string(path, num_cases):
         """
-        Method to return sample inputs as a list
+        Method to return sample inputs as a list
+        """
+        inputs = []
+
+        pack = CasePack.open(path)
+        if pack is not None:
+            with pack:
+                return [pack.read('Input', i) for i in range(num_cases)]
+
+        for i in range(num_cases):
+            inputs += [Utilities.read_case(os.path.join(path, 'Input' + str(i)))]
+
+        return inputs
+
+    @staticmethod
+    def get_cores():
+        """
+        Method to get the number of cores this process may run on
+        """
+        try:
+            return len(os.sched_getaffinity(0))
+        except AttributeError:
+            return os.cpu_count() or 1
+
+    @staticmethod
+    def get_num_workers(jobs, num_cases, reserved=0):
+        """
+        Method to get the number of test cases to be run simultaneously
+        Never exceeds the number of available cores, less those reserved for
+        other work, so that running cases in parallel does not skew their timings
+        """
+        cores = max(1, Utilities.get_cores() - reserved)
+
+        if jobs is None or jobs > cores:
+            jobs = cores
+
+        return max(1, min(jobs, num_cases))
+
+    @staticmethod
+    def run_testcase(execute_command, input_file, output_file, error_file,
+                     time_limit, address_limit=None):
+        """
+        Method to run the solution against a single test case
+        Returns the exit status along with the wall time, CPU time
+        and peak memory used by the solution
+        """
+        launcher = Launcher.get()
+        if launcher is not None:
+            return launcher.run(execute_command, input_file, output_file, error_file,
+                                time_limit, address_limit)
+
+        # Without the launcher the peak memory reported by the kernel also
+        # covers this process' own memory, copied into the child before exec
+        with open(input_file, 'r') as stdin, open(output_file, 'w') as stdout, \
+                open(error_file, 'w') as stderr:
+            start = time.perf_counter()
+            try:
+                proc = subprocess.Popen(execute_command, stdin=stdin, stdout=stdout, stderr=stderr)
+            except OSError as e:
+                print(e)
+                return {'status': 127 << 8, 'timed_out': False, 'wall': None, 'cpu': None, 'rss': None}
+
+            # Limited from here rather than in the child, as test cases are
+            # run from several threads at once. prlimit is only on Linux, and
+            # elsewhere the peak memory alone is checked
+            if address_limit and hasattr(resource, 'prlimit'):
+                with contextlib.suppress(OSError):
+                    resource.prlimit(proc.pid, resource.RLIMIT_AS, (address_limit, address_limit))
+
+            timer = threading.Timer(time_limit, proc.kill)
+            timer.start()
+            _, status, usage = os.wait4(proc.pid, 0)
+            wall = time.perf_counter() - start
+            timer.cancel()
+            proc.returncode = status
+
+        return {
+            'status': status,
+            'timed_out': wall > time_limit,
+            'wall': wall,
+            'cpu': usage.ru_utime + usage.ru_stime,
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            'rss': usage.ru_maxrss * (1 if platform.system() == 'Darwin' else 1024),
+        }
+
+    @staticmethod
+    def check_memory_limit(result, errors, memory_limit):
+        """
+        Method to find whether a test case exceeded the memory limit, either
+        by its peak memory or by failing on an allocation
+        """
+        if result['rss'] is not None and result['rss'] > memory_limit:
+            return True
+
+        return result['status'] != 0 and any(error in errors for error in Utilities.memory_errors)
+
+    @staticmethod
+    def build_tool(source_file, interpreter, name):
+        """
+        Method to compile a checker or interactor
+        Returns the command to run it with
+        """
+        extension = source_file.split('.')[-1]
+        basename = os.path.basename(source_file).split('.')[0]
+
+        if not os.path.isfile(source_file):
+            print('ERROR : No such file %s' % (source_file))
+            sys.exit(0)
+
+        if extension not in ['c', 'cpp', 'java', 'py', 'hs', 'rb']:
+            print('Supports only C, C++, Python, Java, Ruby and Haskell %ss as of now.' % (name))
+            sys.exit(0)
+
+        compile_status, _, command = Utilities.build_command(
+            extension, os.path.abspath(source_file), basename, interpreter)
+
+        if compile_status != 0:
+            print(Utilities.colors['BOLD'] + Utilities.colors['RED'] + 'Compilation error in the %s' % (
+                name) + Utilities.colors['ENDC'] + '.')
+            sys.exit(0)
+
+        return command
+
+    @staticmethod
+    def checker_verdict(status, message):
+        """
+        Method to get the verdict for the exit status of a testlib style
+        checker or interactor, along with the first line of its message
+        """
+        verdict = {0: 'AC', 2: 'PE', 3: 'FAIL'}.get(status, 'WA')
+        message = message.decode('utf-8', errors='replace').strip().split('\n')[0]
+        return verdict, message[:100] if message else None
+
+    @staticmethod
+    def run_checker(checker_command, input_file, output_file, answer_file):
+        """
+        Method to verify the output of a test case with a testlib style checker
+        Returns the verdict and the message of the checker
+        """
+        time_limit = float(Utilities.get_constant('checker_time_limit', 10))
+        try:
+            proc = subprocess.Popen(checker_command + [input_file, output_file, answer_file],
+                                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE)
+        except OSError as e:
+            return 'FAIL', str(e)
+
+        # Lowered from here rather than in the child, as checkers are started
+        # from several threads at once
+        with contextlib.suppress(OSError):
+            os.setpriority(os.PRIO_PROCESS, proc.pid, 19)
+
+        with proc:
+            try:
+                _, errors = proc.communicate(timeout=time_limit)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+                return 'FAIL', 'Checker took more than %g seconds' % (time_limit)
+
+        return Utilities.checker_verdict(proc.returncode, errors)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def interact(interactor_command, input_file, output_file):
+        """
+        Method to run a testlib style interactor alongside a solution
+        Yields the paths the solution reads its input from and writes its
+        output to, and a dict which holds the verdict and message of the
+        interactor once the solution is done
+        """
+        fifo_dir = tempfile.mkdtemp(prefix='acedit')
+        to_solution = os.path.join(fifo_dir, 'Input')
+        from_solution = os.path.join(fifo_dir, 'Output')
+        os.mkfifo(to_solution, 0o600)
+        os.mkfifo(from_solution, 0o600)
+        interaction = {}
+
+        def start():
+            # Opened in the same order as the solution opens its ends, so
+            # that neither waits for the other
+            stdout = os.open(to_solution, os.O_WRONLY)
+            stdin = os.open(from_solution, os.O_RDONLY)
+            try:
+                interaction['proc'] = subprocess.Popen(interactor_command + [input_file, output_file],
+                                                       stdin=stdin, stdout=stdout, stderr=subprocess.PIPE)
+            except OSError as e:
+                interaction['error'] = str(e)
+            finally:
+                os.close(stdin)
+                os.close(stdout)
+
+        starter = threading.Thread(target=start)
+        starter.daemon = True
+        starter.start()
+
+        try:
+            yield to_solution, from_solution, interaction
+        finally:
+            # The interactor waits for the solution if it never opened its ends
+            while starter.is_alive():
+                fd = os.open(to_solution, os.O_RDONLY | os.O_NONBLOCK)
+                starter.join(0.01)
+                try:
+                    os.close(os.open(from_solution, os.O_WRONLY | os.O_NONBLOCK))
+                except OSError as e:
+                    if e.errno != errno.ENXIO:
+                        raise
+                starter.join(0.01)
+                os.close(fd)
+
+            proc = interaction.pop('proc', None)
+            if proc is None:
+                interaction['verdict'] = 'FAIL'
+                interaction['message'] = interaction.pop('error', None)
+            else:
+                time_limit = float(Utilities.get_constant('checker_time_limit', 10))
+                try:
+                    _, message = proc.communicate(timeout=time_limit)
+                    interaction['verdict'], interaction['message'] = Utilities.checker_verdict(
+                        proc.returncode, message)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+                    interaction['verdict'] = 'FAIL'
+                    interaction['message'] = 'Interactor took more than %g seconds' % (time_limit)
+
+            shutil.rmtree(fifo_dir, ignore_errors=True)
+
+    @staticmethod
+    def format_usage(result):
+        """
+        Method to format the resources used for a test case as table cells
+        """
+        return [
+            '%.3fs' % result['wall'] if result['wall'] is not None else 'N/A',
+            '%.3fs' % result['cpu'] if result['cpu'] is not None else 'N/A',
+            '%.1fMB' % (result['rss'] / (1024.0 * 1024)) if result['rss'] is not None else 'N/A',
+        ]
+
+    @staticmethod
+    def get_compiler_version(compiler):
+        """
+        Method to get the version string of a compiler
+        """
+        version_flag = '-version' if compiler[0] in ['java', 'javac'] else '--version'
+        try:
+            proc = subprocess.Popen([compiler[0], version_flag],
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            version = proc.communicate()[0]
+        except OSError:
+            return ''
+
+        return version.decode('utf-8', 'replace').strip()
+
+    @staticmethod
+    def build_command(extension, source_file, basename, interpreter='python'):
+        """
+        Method to compile a program and get the command to run it with
+        Returns the compilation status, the directory holding the build and
+        the command
+        """
+        compile_status, build_dir = Utilities.compile_solution(extension, source_file, basename)
+        if compile_status != 0:
+            return compile_status, None, None
+
+        binary = [os.path.join(build_dir, basename)] if build_dir else None
+        execute_command = {
+            'py': [interpreter, source_file],
+            'rb': ['ruby', source_file],
+            'hs': binary,
+            'c': binary,
+            'cpp': binary,
+            'java': ['java'] + Utilities.java_flags + ['-cp', build_dir or '.', basename]
+        }[extension]
+
+        return compile_status, build_dir, execute_command
+
+    @staticmethod
+    def compile_solution(extension, source_file, basename, compiler=None):
+        """
+        Method to compile the solution, reusing a cached build if the source,
+        compiler command and compiler version have not changed
+        Returns the compilation status and the directory holding the build
+        """
+        compiler = compiler or Utilities.compilers.get(extension)
+
+        if compiler is None:
+            # Interpreted language, nothing to build
+            return 0, None
+
+        with open(source_file, 'rb') as f:
+            source = f.read()
+
+        key = hashlib.sha256()
+        for part in [source, basename, ' '.join(compiler), Utilities.get_compiler_version(compiler)]:
+            key.update(part if isinstance(part, bytes) else part.encode('utf-8'))
+            key.update(b'\0')
+
+        builds_dir = os.path.join(Utilities.cache_dir, 'builds')
+        build_dir = os.path.join(builds_dir, key.hexdigest())
+
+        if os.path.isdir(build_dir):
+            # Mark as recently used for eviction
+            os.utime(build_dir, None)
+            return 0, build_dir
+
+        if not os.path.isdir(builds_dir):
+            os.makedirs(builds_dir)
+
+        # Build in a private directory and move it in place only on success,
+        # so that a failed or interrupted build never ends up in the cache
+        temp_dir = tempfile.mkdtemp(prefix='tmp', dir=builds_dir)
+        binary = os.path.join(temp_dir, basename)
+        output_flags = {
+            'hs': ['-outputdir', temp_dir, '-o', binary],
+            'java': ['-d', temp_dir],
+        }.get(extension, ['-o', binary])
+
+        try:
+            status = subprocess.call(compiler + output_flags + [source_file])
+        except OSError:
+            status = -1
+
+        if status != 0:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return status, None
+
+        try:
+            os.rename(temp_dir, build_dir)
+        except OSError:
+            # Another run built the same source in the meantime
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        Utilities.evict_builds(build_dir)
+
+        return 0, build_dir
+
+    @staticmethod
+    def evict_builds(keep):
+        """
+        Method to remove least recently used builds until the build cache
+        fits within build_cache_size megabytes
+        """
+        builds_dir = os.path.join(Utilities.cache_dir, 'builds')
+        limit = int(Utilities.get_constant('build_cache_size', 512)) * 1024 * 1024
+
+        entries, total = [], 0
+        for name in os.listdir(builds_dir):
+            path = os.path.join(builds_dir, name)
+            if name.startswith('tmp') or not os.path.isdir(path):
+                # Build in progress
+                continue
+            size = sum(os.path.getsize(os.path.join(root, f))
+                       for root, _, files in os.walk(path) for f in files)
+            entries += [(os.path.getmtime(path), size, path)]
+            total += size
+
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    @staticmethod
+    def write_harness(filename):
+        """
+        Method to write the source of a runner harness, shipped in
+        acedit/harness, to the cache
+        Returns the path of the written file
+        """
+        harness_dir = os.path.join(Utilities.cache_dir, 'harness')
+        source_file = os.path.join(harness_dir, filename)
+        source = pkgutil.get_data('acedit', 'harness/' + filename).decode('utf-8')
+
+        if not os.path.isdir(harness_dir):
+            os.makedirs(harness_dir)
+
+        current = None
+        if os.path.isfile(source_file):
+            with open(source_file, 'r') as f:
+                current = f.read()
+
+        if current != source:
+            with open(source_file, 'w') as f:
+                f.write(source)
+
+        return source_file
+
+    @staticmethod
+    def cleanup(output_dir, captures):
+        """
+        Method to clean up the captured outputs of a run
+        """
+        for capture in captures:
+            capture.close()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    @staticmethod
+    def handle_kbd_interrupt(site, contest, problem):
+        """
+        Method to handle keyboard interrupt
+        """
+        from shutil import rmtree
+        print('Cleaning up...')
+
+        # Handle case for SPOJ specially as it does not have contests
+        contest = '' if site == 'spoj' else contest
+
+        if problem is not None:
+            path = os.path.join(Utilities.cache_dir, site, contest, problem)
+            if os.path.isdir(path):
+                rmtree(path)
+        else:
+            path = os.path.join(Utilities.cache_dir, site, contest)
+            if os.path.isdir(path):
+                rmtree(path)
+
+        Utilities.remove_from_index(site, contest, problem)
+
+        print('Done. Exiting gracefully.')
+
+    @staticmethod
+    def run_solution(args):
+        """
+        Method to run and test the user's solution against sample cases
+        """
+        problem = args['source']
+
+        extension = problem.split('.')[-1]
+        problem = problem.split('.')[0]
+        basename = problem.split('/')[-1]
+        problem_path = os.path.join(os.getcwd(), problem)
+
+        if not os.path.isfile(problem_path + '.' + extension):
+            print('ERROR : No such file')
+            sys.exit(0)
+
+        problem_code = args['problem'] if args['problem'] else basename
+        contest_code = '' if args['site'] == 'spoj' else args['contest']
+
+        testcases_path = os.path.join(Utilities.cache_dir, args[
+                                      'site'], contest_code, problem_code)
+
+        cached = Utilities.get_cached_problem(args['site'], contest_code, problem_code)
+        if cached is not None:
+            # Misses are counted by the download
+            Utilities.record_lookup(args['site'], contest_code, problem_code, True)
+
+        if cached is not None and os.path.isdir(testcases_path):
+            num_cases = cached['cases']
+            results, expected_outputs, user_outputs = [], [], []
+
+            if extension in ['c', 'cpp', 'java', 'py', 'hs', 'rb']:
+
+                source_file = problem_path + '.' + extension
+                compile_status, build_dir, execute_command = Utilities.build_command(
+                    extension, source_file, basename, args['interpreter'])
+
+                if compile_status == 0:
+                    # Compiled successfully
+                    checker = interactor = None
+                    if args['checker']:
+                        checker = Utilities.build_tool(args['checker'], args['interpreter'], 'checker')
+                    if args['interactor']:
+                        interactor = Utilities.build_tool(args['interactor'], args['interpreter'], 'interactor')
+
+                    # Checkers get cores of their own, so that they do not slow down
+                    # the cases being run, and run at a low priority where there are none
+                    checker_workers = max(1, Utilities.get_cores() // 4) if checker is not None else 0
+                    num_workers = Utilities.get_num_workers(args['jobs'], num_cases, checker_workers)
+                    limits = {'time_limit': cached['time_limit'], 'memory_limit': cached['memory_limit']}
+                    time_scale = args['time_scale'] or float(Utilities.get_constant('time_scale', 1))
+                    time_limit = (limits.get('time_limit') or 2) * time_scale
+                    memory_limit = (args['memory_limit'] or limits.get('memory_limit') or 256) * 1024 * 1024
+
+                    if extension == 'java':
+                        # The address space of a JVM is far larger than its heap
+                        execute_command[1:1] = ['-Xmx%dm' % (memory_limit // (1024 * 1024))]
+
+                    # The GHC, Ruby and PyPy runtimes reserve a huge address space
+                    # up front, so they are only checked by their peak memory
+                    limit_address_space = extension in ['c', 'cpp'] or (
+                        extension == 'py' and 'pypy' not in os.path.basename(args['interpreter']))
+                    address_limit = memory_limit if limit_address_space else None
+
+                    def run_process(input_file, output_file, error_file):
+                        return Utilities.run_testcase(execute_command, input_file, output_file,
+                                                      error_file, time_limit, address_limit)
+
+                    if extension == 'java' and args['warm_jvm']:
+                        # One JVM per worker, reused across the cases it runs
+                        harnesses = queue.Queue()
+                        for _ in range(num_workers):
+                            harnesses.put(JavaHarness(build_dir, basename, memory_limit))
+
+                    elif extension in ForkServer.sources and args['fork_server']:
+                        # One pre-started interpreter per worker
+                        harnesses = queue.Queue()
+                        for _ in range(num_workers):
+                            harnesses.put(ForkServer(extension, source_file, args['interpreter']))
+
+                    else:
+                        harnesses = None
+
+                    if harnesses is not None:
+
+                        def run_testcase(input_file, output_file, error_file):
+                            harness = harnesses.get()
+                            try:
+                                result = harness.run(input_file, output_file, error_file,
+                                                     time_limit, memory_limit)
+                            finally:
+                                harnesses.put(harness)
+                            # A harness which cannot be used leaves the case to a process of its own
+                            if result is None:
+                                result = run_process(input_file, output_file, error_file)
+                            return result
+                    else:
+                        run_testcase = run_process
+
+                    if args['bench']:
+                        pack = CasePack.open(testcases_path)
+                        try:
+                            Utilities.bench_solution(args, run_testcase, testcases_path, num_cases, pack)
+                        finally:
+                            if harnesses is not None:
+                                while not harnesses.empty():
+                                    harnesses.get().close()
+                            if pack is not None:
+                                pack.close()
+                        return
+
+                    pack = CasePack.open(testcases_path)
+
+                    # Outputs are captured through pipes in a private directory
+                    output_dir = tempfile.mkdtemp(prefix='acedit')
+                    captures = []
+
+                    # Checkers run while the next test cases are run
+                    checkers = ThreadPoolExecutor(max_workers=max(1, checker_workers))
+
+                    def check_case(i, output):
+                        with Utilities.case_file(testcases_path, 'Input', i, pack) as input_file, \
+                                Utilities.case_file(testcases_path, 'Output', i, pack) as answer_file, \
+                                output.file() as output_file:
+                            return Utilities.run_checker(checker, input_file, output_file, answer_file)
+
+                    def run_case(i):
+                        output = OutputCapture(output_dir, 'Output' + str(i))
+                        error = OutputCapture(output_dir, 'Error' + str(i))
+                        captures.extend([output, error])
+
+                        with Utilities.case_file(testcases_path, 'Input', i, pack) as input_file:
+                            if interactor is None:
+                                result = run_testcase(input_file, output.path, error.path)
+                            else:
+                                # The output checked is the one written by the interactor
+                                with Utilities.interact(interactor, input_file, output.path) as (
+                                        solution_input, solution_output, interaction):
+                                    result = run_testcase(solution_input, solution_output, error.path)
+                                result['interaction'] = interaction
+                        output.wait()
+                        errors = error.read()
+                        error.close()
+
+                        sys.stderr.write(errors)
+                        result['output'] = output
+                        result['memory_exceeded'] = Utilities.check_memory_limit(
+                            result, errors, memory_limit)
+
+                        if checker is not None and result['status'] == 0 and not result['timed_out'] \
+                                and not result['memory_exceeded']:
+                            result['check'] = checkers.submit(check_case, i, output)
+                        return result
+
+                    def judge(i, case_result):
+                        interaction = case_result.get('interaction')
+                        if interaction is not None and (interaction['verdict'] != 'AC' or checker is None):
+                            return interaction['verdict'], interaction['message']
+                        if 'check' in case_result:
+                            return case_result['check'].result()
+
+                        difference = Utilities.compare_outputs(
+                            functools.partial(Utilities.case_chunks, testcases_path, 'Output', i, pack),
+                            case_result['output'].chunks, args['abs_error'], args['rel_error'])
+                        return ('AC', None) if difference is None else ('WA', difference)
+
+                    try:
+                        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                            case_results = list(executor.map(run_case, range(num_cases)))
+
+                        if harnesses is not None:
+                            while not harnesses.empty():
+                                harnesses.get().close()
+
+                        for i, case_result in enumerate(case_results):
+                            status = case_result['status']
+                            expected_outputs += [Utilities.preview(
+                                Utilities.case_chunks(testcases_path, 'Output', i, pack))]
+
+                            if case_result['timed_out']:
+                                # Time Limit Exceeded
+                                results += [Utilities.colors['BOLD'] + Utilities.colors[
+                                    'YELLOW'] + 'TLE' + Utilities.colors['ENDC']]
+                                user_outputs += ['']
+
+                            elif case_result['memory_exceeded']:
+                                # Memory Limit Exceeded
+                                results += [Utilities.colors['BOLD'] + Utilities.colors[
+                                    'YELLOW'] + 'MLE' + Utilities.colors['ENDC']]
+                                user_outputs += ['']
+
+                            elif status == 0:
+                                # Ran successfully, judged as correct (AC), wrong (WA),
+                                # wrongly formatted (PE) or not at all by a failing checker (FAIL)
+                                user_outputs += [Utilities.preview(case_result['output'].chunks())]
+
+                                verdict, message = judge(i, case_result)
+                                color = {'AC': 'GREEN', 'FAIL': 'YELLOW'}.get(verdict, 'RED')
+                                results += [Utilities.colors['BOLD'] + Utilities.colors[color] + verdict +
+                                            Utilities.colors['ENDC'] + ('\n' + message if message else '')]
+
+                            else:
+                                # Runtime Error
+                                results += [Utilities.colors['BOLD'] +
+                                            Utilities.colors['RED'] + 'RTE' + Utilities.colors['ENDC']]
+                                user_outputs += ['']
+                    finally:
+                        checkers.shutdown()
+                        Utilities.cleanup(output_dir, captures)
+                else:
+                    # Compilation error occurred
+                    message = Utilities.colors['BOLD'] + Utilities.colors[
+                        'RED'] + 'Compilation error. Not run against test cases' + Utilities.colors['ENDC'] + '.'
+                    print(message)
+                    sys.exit(0)
+
+            else:
+                print('Supports only C, C++, Python, Java, Ruby and Haskell as of now.')
+                sys.exit(0)
+
+            from terminaltables import AsciiTable
+            table_data = [['Serial No', 'Input',
+                           'Expected Output', 'Your Output', 'Result',
+                           'Time', 'CPU', 'Memory']]
+
+            inputs = Utilities.input_file_to_string(testcases_path, num_cases)
+
+            for i in range(num_cases):
+
+                row = [
+                    i + 1,
+                    inputs[i],
+                    expected_outputs[i],
+                    user_outputs[i] if any(sub in results[i]
+                                           for sub in ['AC', 'WA', 'PE']) else 'N/A',
+                    results[i]
+                ] + Utilities.format_usage(case_results[i])
+
+                table_data.append(row)
+
+            table = AsciiTable(table_data)
+
+            print(table.table)
+
+            if pack is not None:
+                pack.close()
+
+        else:
+            print('Test cases not found locally...')
+
+            args['problem'] = problem_code
+            args['force'] = True
+            args['source'] = problem + '.' + extension
+
+            Utilities.download_problem_testcases(args)
+
+            # Run again only if the download left test cases to run against
+            if Utilities.get_cached_problem(args['site'], contest_code, problem_code) is None:
+                print('No test cases were found for %s.' % (problem_code))
+                sys.exit(0)
+
+            print('Running your solution against sample cases...')
+            Utilities.run_solution(args)
+
+    @staticmethod
+    def summarize(samples):
+        """
+        Method to get the min, median, mean and standard deviation of timings
+        """
+        if not samples:
+            return None
+        return {
+            'min': min(samples),
+            'median': statistics.median(samples),
+            'mean': statistics.mean(samples),
+            'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        }
+
+    @staticmethod
+    def bench_solution(args, run_testcase, testcases_path, num_cases, pack=None):
+        """
+        Method to time the user's solution over repeated runs of every test
+        case, after some warm-up runs
+        Runs one at a time, so that runs do not compete for cores
+        """
+        runs, warmup = args['bench'], args['warmup']
+        cases, totals = [], {'wall': [0.0] * runs, 'cpu': [0.0] * runs}
+
+        print('Running each of %d test cases %d times after %d warm-up runs...' % (
+            num_cases, runs, warmup))
+
+        # Ctrl-C stops benchmarking, and the runs so far are still reported.
+        # A test case cut short is left out of the totals
+        interrupted, completed = False, 0
+        for i in range(num_cases):
+            samples, failures, timings = {'wall': [], 'cpu': []}, set(), []
+            try:
+                for run in range(warmup + runs):
+                    with Utilities.case_file(testcases_path, 'Input', i, pack) as input_file:
+                        result = run_testcase(input_file, os.devnull, os.devnull)
+
+                    if result['timed_out']:
+                        failures.add('TLE')
+                    elif result['status'] != 0:
+                        failures.add('RTE')
+
+                    if run >= warmup:
+                        timings += [result]
+            except KeyboardInterrupt:
+                interrupted = True
+                print('\nStopped.')
+
+            for run, result in enumerate(timings):
+                for key in ['wall', 'cpu']:
+                    if result[key] is not None:
+                        samples[key] += [result[key]]
+                        if not interrupted:
+                            totals[key][run] += result[key]
+
+            if timings:
+                cases += [{
+                    'case': i + 1,
+                    'failures': sorted(failures),
+                    'wall': Utilities.summarize(samples['wall']),
+                    'cpu': Utilities.summarize(samples['cpu']),
+                    'samples': samples,
+                }]
+            if interrupted:
+                break
+            completed += 1
+
+        report = {
+            'source': args['source'],
+            'site': args['site'],
+            'contest': args['contest'],
+            'problem': os.path.basename(testcases_path),
+            'runs': runs,
+            'warmup': warmup,
+            'interrupted': interrupted,
+            'cases': cases,
+            'total': {key: Utilities.summarize(totals[key]) if completed else None
+                      for key in ['wall', 'cpu']},
+        }
+
+        baseline = {}
+        if args['bench_compare']:
+            with open(args['bench_compare'], 'r') as f:
+                earlier = json.loads(f.read())
+            baseline = {case['case']: case for case in earlier['cases']}
+            baseline['Total'] = earlier['total']
+
+        def cells(name, stats, failures=()):
+            row = [name]
+            for key in ['wall', 'cpu']:
+                if stats[key] is None:
+                    row += ['N/A'] * 4
+                else:
+                    row += ['%.3fs' % stats[key][stat] for stat in ['min', 'median', 'mean', 'stddev']]
+
+            if baseline:
+                earlier = baseline.get(name, {}).get('wall')
+                if earlier and stats['wall'] and stats['wall']['median'] > 0:
+                    row += ['%.2fx' % (earlier['median'] / stats['wall']['median'])]
+                else:
+                    row += ['N/A']
+
+            if failures:
+                row[0] = '%s %s' % (name, Utilities.colors['BOLD'] + Utilities.colors[
+                    'RED'] + '/'.join(failures) + Utilities.colors['ENDC'])
+            return row
+
+        from terminaltables import AsciiTable
+        table_data = [['Serial No', 'Time min', 'Time median', 'Time mean', 'Time stddev',
+                       'CPU min', 'CPU median', 'CPU mean', 'CPU stddev'] + (['Speedup'] if baseline else [])]
+        table_data += [cells(case['case'], case, case['failures']) for case in cases]
+        table_data += [cells('Total', report['total'])]
+
+        print(AsciiTable(table_data).table)
+
+        if args['bench_output']:
+            with open(args['bench_output'], 'w') as f:
+                f.write(json.dumps(report, indent=2))
+            print('Results saved to %s.' % (args['bench_output']))
+
+    @staticmethod
+    def run_program(command, input_data, time_limit):
+        """
+        Method to run a program on an input held in memory
+        Returns its output, and the reason it failed or None
+        """
+        try:
+            proc = subprocess.run(command, input=input_data, stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE, timeout=time_limit)
+        except subprocess.TimeoutExpired:
+            return None, 'TLE'
+        except OSError as e:
+            return None, str(e)
+
+        if proc.returncode != 0:
+            error = proc.stderr.decode('utf-8', errors='replace').strip().split('\n')[-1]
+            return None, 'RTE' + (': ' + error[:100] if error else '')
+        return proc.stdout, None
+
+    @staticmethod
+    def stress_test(args):
+        """
+        Method to compare the user's solution with a brute force solution on
+        inputs from a generator, until their outputs differ
+        The smallest failing input found is added to the cached test cases
+        """
+        basename = os.path.basename(args['source']).split('.')[0]
+        problem_code = args['problem'] if args['problem'] else basename
+        contest_code = '' if args['site'] == 'spoj' else args['contest']
+        testcases_path = os.path.join(Utilities.cache_dir, args['site'], contest_code, problem_code)
+
+        solution = Utilities.build_tool(args['source'], args['interpreter'], 'solution')
+        brute = Utilities.build_tool(args['brute'], args['interpreter'], 'brute force solution')
+        generator = Utilities.build_tool(args['gen'], args['interpreter'], 'generator')
+        checker = None
+        if args['checker']:
+            checker = Utilities.build_tool(args['checker'], args['interpreter'], 'checker')
+
+        cached = Utilities.get_cached_problem(args['site'], contest_code, problem_code)
+        time_scale = args['time_scale'] or float(Utilities.get_constant('time_scale', 1))
+        time_limit = ((cached['time_limit'] if cached is not None else None) or 2) * time_scale
+        # Generators and brute force solutions are not held to the time limit
+        tool_time_limit = float(Utilities.get_constant('checker_time_limit', 10))
+
+        def run_iteration(seed):
+            # The seed is passed like to testlib generators, which seed from their arguments
+            input_data, failure = Utilities.run_program(generator + [str(seed)], b'', tool_time_limit)
+            if failure is not None:
+                return seed, b'', None, None, 'Generator failed: ' + failure
+
+            expected, failure = Utilities.run_program(brute, input_data, tool_time_limit)
+            if failure is not None:
+                return seed, input_data, None, None, 'Brute force solution failed: ' + failure
+
+            output, failure = Utilities.run_program(solution, input_data, time_limit)
+            if failure is not None:
+                return seed, input_data, expected, None, failure
+
+            if checker is None:
+                difference = Utilities.compare_outputs(
+                    lambda: [expected], lambda: [output], args['abs_error'], args['rel_error'])
+                return None if difference is None else (
+                    seed, input_data, expected, output, 'WA\n' + difference)
+
+            with tempfile.TemporaryDirectory(prefix='acedit') as case_dir:
+                files = []
+                for name, data in [('Input', input_data), ('Output', output), ('Answer', expected)]:
+                    files += [os.path.join(case_dir, name)]
+                    with open(files[-1], 'wb') as f:
+                        f.write(data)
+                verdict, message = Utilities.run_checker(checker, *files)
+
+            return None if verdict == 'AC' else (
+                seed, input_data, expected, output, verdict + ('\n' + message if message else ''))
+
+        iterations = args['iterations']
+        num_workers = Utilities.get_num_workers(args['jobs'], iterations)
+        seeds = iter(range(1, iterations + 1))
+        failures, done = [], 0
+
+        print('Running %d iterations on %d cores...' % (iterations, num_workers))
+        start = last_report = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            pending = set(executor.submit(run_iteration, seed)
+                          for seed in itertools.islice(seeds, num_workers * 2))
+            try:
+                while pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    done += len(finished)
+                    results = [future.result() for future in finished]
+                    failures += [result for result in results if result is not None]
+
+                    if not failures:
+                        # Iterations already started are finished after a mismatch,
+                        # to pick the smallest failing input among them
+                        pending |= set(executor.submit(run_iteration, seed)
+                                       for seed in itertools.islice(seeds, len(finished)))
+
+                    if time.perf_counter() - last_report >= 1:
+                        last_report = time.perf_counter()
+                        sys.stdout.write('\r%d iterations, %.1f iterations/sec' % (
+                            done, done / (last_report - start)))
+                        sys.stdout.flush()
+            except KeyboardInterrupt:
+                for future in pending:
+                    future.cancel()
+                print('\nStopped.')
+
+        elapsed = time.perf_counter() - start
+        print('\r%d iterations in %.2fs, %.1f iterations/sec' % (done, elapsed, done / elapsed))
+
+        if not failures:
+            print(Utilities.colors['BOLD'] + Utilities.colors['GREEN'] +
+                  'No difference found' + Utilities.colors['ENDC'] + '.')
+            return
+
+        seed, input_data, expected, output, reason = min(failures, key=lambda f: (len(f[1]), f[0]))
+        print(Utilities.colors['BOLD'] + Utilities.colors['RED'] + 'Failed on seed %d: %s' % (
+            seed, reason) + Utilities.colors['ENDC'])
+        for title, data in [('Input', input_data), ('Expected Output', expected), ('Your Output', output)]:
+            if data is not None:
+                print('%s:\n%s' % (title, Utilities.preview([data])))
+
+        if expected is None:
+            # Nothing to compare against
+            return
+
+        if cached is not None and os.path.isdir(testcases_path):
+            inputs, outputs = Utilities.load_cases(testcases_path)
+            # The limits stored with the problem, if it has any, are kept as they are
+            limits = Utilities.get_limits(testcases_path)
+        else:
+            if not os.path.isdir(testcases_path):
+                os.makedirs(testcases_path)
+            inputs, outputs, limits = [], [], None
+
+        Utilities.store_files(args['site'], contest_code, problem_code,
+                              inputs + [input_data.decode('utf-8', errors='replace')],
+                              outputs + [expected.decode('utf-8', errors='replace')], limits)
+        print('Saved as test case %d of %s.' % (len(inputs) + 1, problem_code))
+
+    @staticmethod
+    def get_session(url, batch=False):
+        """
+        Utility function to get the shared session for the host of an url
+        Connections are kept alive and reused, and failed requests are
+        retried with exponential backoff
+        Sessions for batch requests leave responses of an overloaded host to
+        the rate limiter, which slows down and retries them
+        """
+        key = urlparse(url).netloc, batch
+
+        with Utilities.sessions_lock:
+            if key not in Utilities.sessions:
+                statuses = Utilities.retry_statuses
+                if batch:
+                    statuses = [status for status in statuses
+                                if status not in RateLimiter.overloaded_statuses]
+                # Retry-After would make urllib3 retry 429 and 503 regardless
+                retries = Retry(total=int(Utilities.get_constant('max_retries', 3)),
+                                backoff_factor=0.5,
+                                status_forcelist=statuses,
+                                respect_retry_after_header=not batch,
+                                raise_on_status=False)
+                adapter_class = HTTPAdapter if Utilities.archive is None else ArchiveAdapter
+                adapter = adapter_class(pool_connections=1,
+                                        pool_maxsize=int(Utilities.get_constant('pool_size', 10)),
+                                        max_retries=retries)
+                session = rq.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                Utilities.sessions[key] = session
+
+            return Utilities.sessions[key]
+
+    @staticmethod
+    def open_archive(args):
+        """
+        Utility function to open the archive given by --record or --replay
+        """
+        if args.get('record'):
+            Utilities.archive = Archive(args['record'], False)
+        elif args.get('replay'):
+            Utilities.archive = Archive(args['replay'], True,
+                                        args['replay_latency'], args['replay_error_rate'])
+
+    @staticmethod
+    def close_archive():
+        """
+        Utility function to write out the responses recorded to the archive
+        """
+        if Utilities.archive is not None:
+            Utilities.archive.close()
+            Utilities.archive = None
+
+    @staticmethod
+    def get_rate_limiter(url):
+        """
+        Utility function to get the shared rate limiter for the host of an url
+        """
+        host = urlparse(url).netloc
+
+        with Utilities.sessions_lock:
+            if host not in Utilities.rate_limiters:
+                Utilities.rate_limiters[host] = RateLimiter(
+                    int(Utilities.get_constant('max_connections_per_host', 4)),
+                    float(Utilities.get_constant('requests_per_second', 5)))
+
+            return Utilities.rate_limiters[host]
+
+    @staticmethod
+    def get_parser_pool(num_pages):
+        """
+        Utility function to get a pool of worker processes to parse pages in
+        Workers are started afresh rather than forked, as the main process
+        already runs threads and holds the index open
+        Falls back to threads where processes cannot be used
+        """
+        num_workers = Utilities.get_num_workers(None, num_pages)
+        try:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            # Ctrl-C is handled by the main process alone
+            return ProcessPoolExecutor(max_workers=num_workers, mp_context=context,
+                                       initializer=signal.signal, initargs=(signal.SIGINT, signal.SIG_IGN))
+        except TypeError:
+            # Workers could only be forked before Python 3.7
+            return ThreadPoolExecutor(max_workers=num_workers)
+        except (ImportError, NotImplementedError, OSError, ValueError):
+            return ThreadPoolExecutor(max_workers=num_workers)
+
+    @staticmethod
+    def get_timeout():
+        """
+        Utility function to get the connect and read timeouts for requests
+        """
+        return (float(Utilities.get_constant('connect_timeout', 5)),
+                float(Utilities.get_constant('read_timeout', 30)))
+
+    @staticmethod
+    def get_html(url, headers=None):
+        """
+        Utility function get the html content of an url
+        """
+        sys.setrecursionlimit(10000)
+        try:
+            r = Utilities.get_session(url).get(url, headers=headers, timeout=Utilities.get_timeout())
+        except rq.exceptions.RequestException:
+            print('Please check your internet connection and try again.')
+            sys.exit(0)
+
+        if r.status_code in Utilities.retry_statuses:
+            print('Could not fetch content. Please try again.')
+            sys.exit(0)
+
+        return r
+
+    @staticmethod
+    def get_response_path(url):
+        """
+        Utility function to get the path of the cached response for an url
+        """
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(Utilities.cache_dir, 'http', key + '.json')
+
+    @staticmethod
+    def load_response(url):
+        """
+        Utility function to get the cached response for an url
+        Returns None if the url has no cached response
+        """
+        try:
+            with open(Utilities.get_response_path(url), 'r') as f:
+                return json.loads(f.read())
+        except (IOError, ValueError):
+            return None
+
+    @staticmethod
+    def save_response(url, page, headers, site, contest, problem):
+        """
+        Utility function to cache a parsed response, along with the validators
+        to revalidate it with and the problem it was parsed as
+        The response is counted towards the size of the problem in the index
+        """
+        entry = Utilities.load_response(url) or {}
+        entry.update({
+            'url': page.url,
+            'text': page.text,
+            'etag': headers.get('ETag') or entry.get('etag'),
+            'last_modified': headers.get('Last-Modified') or entry.get('last_modified'),
+            'fetched': time.time(),
+            'problem': problem,
+        })
+
+        path = Utilities.get_response_path(url)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        # Written to a temporary file first, so that an interrupted write
+        # does not leave a truncated entry behind
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(json.dumps(entry))
+        os.rename(temp_path, path)
+
+        contest = '' if site == 'spoj' else contest
+        index = Utilities.get_index()
+        with Utilities.index_lock, index:
+            index.execute('UPDATE problems SET response = ?, response_bytes = ? '
+                          'WHERE site = ? AND contest = ? AND problem = ?',
+                          (os.path.basename(path), os.path.getsize(path), site, contest, problem))
+
+    @staticmethod
+    def remove_response(name):
+        """
+        Utility function to remove a cached response by its file name
+        """
+        if name and os.path.isfile(os.path.join(Utilities.cache_dir, 'http', name)):
+            os.remove(os.path.join(Utilities.cache_dir, 'http', name))
+
+    @staticmethod
+    def get_orphan_responses(referenced):
+        """
+        Utility function to get the cached responses which belong to no
+        cached problem, such as those cached before responses were indexed
+        Returns the file name and size of each
+        """
+        http_dir = os.path.join(Utilities.cache_dir, 'http')
+        if not os.path.isdir(http_dir):
+            return []
+
+        referenced = set(referenced)
+        return [(name, os.path.getsize(os.path.join(http_dir, name)))
+                for name in sorted(os.listdir(http_dir))
+                if name not in referenced and not name.startswith('tmp')]
+
+    @staticmethod
+    def get_validators(url):
+        """
+        Utility function to get the headers for a conditional request to an url
+        """
+        entry = Utilities.load_response(url) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+
+class RateLimiter:
+    """
+    Class to limit the requests sent to a host, with a cap on the requests
+    in flight and a token bucket on the request rate
+    The rate is halved whenever the host signals it is overloaded, and
+    slowly raised again while requests succeed
+    """
+
+    overloaded_statuses = [429, 503]
+
+    def __init__(self, concurrency, rate):
+        self.slots = threading.Semaphore(concurrency)
+        self.burst = float(concurrency)
+        self.max_rate = rate
+        self.rate = rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def take(self):
+        """
+        Method to take a token for a request
+        Returns 0 if one was taken, or else how long to wait for one in seconds
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = self.paused_until - now
+            if wait > 0:
+                return wait
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """
+        Method to wait for a free slot and a token before sending a request
+        """
+        self.slots.acquire()
+        wait = self.take()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.take()
+
+    def update(self, status, headers):
+        """
+        Method to adapt the rate to the status of a response
+        """
+        with self.lock:
+            if status in RateLimiter.overloaded_statuses:
+                self.rate = max(self.rate / 2, 0.2)
+                self.paused_until = max(self.paused_until,
+                                        time.monotonic() + RateLimiter.get_retry_after(headers))
+            else:
+                self.rate = min(self.rate + 0.5, self.max_rate)
+
+    def release(self, response):
+        """
+        Method to adapt the rate to the outcome of a request and free its slot
+        """
+        if response is not None:
+            self.update(response.status_code, response.headers)
+        self.slots.release()
+
+    @staticmethod
+    def get_retry_after(headers):
+        """
+        Method to get the delay requested by the Retry-After header, in seconds
+        """
+        value = headers.get('Retry-After')
+        if value is None:
+            return 1
+
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+
+        try:
+            date = parsedate_to_datetime(value)
+            return max((date - datetime.now(date.tzinfo)).total_seconds(), 0)
+        except (TypeError, ValueError):
+            return 1
+
+
+class Archive:
+    """
+    Class to record the responses to all requests in a gzipped JSON file,
+    and to serve them from it again, so that downloads can be repeated offline
+    Replayed responses can be delayed and made to fail at a given rate. The
+    failures depend only on the url and the attempt, so repeated runs match
+    """
+
+    recorded_headers = ['ETag', 'Last-Modified', 'Location', 'Retry-After']
+    redirect_statuses = [301, 302, 303, 307, 308]
+    max_redirects = 30
+
+    def __init__(self, path, replaying, latency=0, error_rate=0):
+        self.path = path
+        self.replaying = replaying
+        self.latency = latency
+        self.error_rate = error_rate
+        self.exchanges = {}
+        self.attempts = {}
+        self.lock = threading.Lock()
+
+        if replaying:
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    self.exchanges = json.loads(f.read())['exchanges']
+            except (IOError, ValueError, KeyError):
+                print('Could not read archive %s.' % (path))
+                sys.exit(0)
+
+    def record(self, url, final_url, status, headers, text):
+        """
+        Method to record the response to a request for an url
+        """
+        if status == 304:
+            # Record the page the response refers to instead
+            entry = Utilities.load_response(url)
+            if entry is None:
+                return
+            final_url, status, text = entry['url'], 200, entry['text']
+            headers = {'ETag': entry['etag'], 'Last-Modified': entry['last_modified']}
+
+        headers = dict((key, headers.get(key)) for key in Archive.recorded_headers
+                       if headers.get(key) is not None)
+
+        with self.lock:
+            self.exchanges[url] = {'url': final_url, 'status': status,
+                                   'headers': headers, 'text': text}
+
+    def replay(self, url, headers):
+        """
+        Method to get the recorded response to a request for an url
+        Returns the final url, status, headers and text of the response
+        """
+        with self.lock:
+            attempt = self.attempts.get(url, 0)
+            self.attempts[url] = attempt + 1
+
+        entry = self.exchanges.get(url)
+        if entry is None:
+            return url, 404, {}, ''
+
+        if random.Random('%s#%d' % (url, attempt)).random() < self.error_rate:
+            return url, 503, {}, ''
+
+        etag = entry['headers'].get('ETag')
+        last_modified = entry['headers'].get('Last-Modified')
+        if (etag is not None and etag == headers.get('If-None-Match')) or \
+                (last_modified is not None and last_modified == headers.get('If-Modified-Since')):
+            return entry['url'], 304, entry['headers'], ''
+
+        return entry['url'], entry['status'], entry['headers'], entry['text']
+
+    def replay_redirects(self, url, headers):
+        """
+        Method to get the recorded response to a request for an url,
+        following the redirects recorded on the way to it
+        The threaded engine records every redirect, as its session follows
+        them one request at a time
+        Returns the final url, status, headers and text of the response
+        """
+        for _ in range(Archive.max_redirects):
+            final_url, status, response_headers, text = self.replay(url, headers)
+            if status not in Archive.redirect_statuses or 'Location' not in response_headers:
+                break
+            url = urljoin(final_url, response_headers['Location'])
+        return final_url, status, response_headers, text
+
+    def close(self):
+        """
+        Method to write the recorded responses to the archive
+        """
+        if self.replaying:
+            return
+
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({'version': 1, 'exchanges': self.exchanges}))
+        print('Recorded %d responses to %s' % (len(self.exchanges), self.path))
+
+
+class ArchiveAdapter(HTTPAdapter):
+    """
+    Transport adapter to record the responses of a session to the archive,
+    or to serve them from it
+    Replayed requests are retried like the requests sent to the site
+    """
+
+    def send(self, request, **kwargs):
+        archive = Utilities.archive
+
+        if not archive.replaying:
+            response = super(ArchiveAdapter, self).send(request, **kwargs)
+            archive.record(request.url, request.url, response.status_code,
+                           response.headers, response.text)
+            return response
+
+        for attempt in range(1 + self.max_retries.total):
+            if attempt > 0:
+                time.sleep(0.5 * 2 ** (attempt - 1))
+            time.sleep(archive.latency)
+            url, status, headers, text = archive.replay(request.url, request.headers)
+            if status not in Utilities.retry_statuses:
+                break
+
+        response = rq.models.Response()
+        response.status_code = status
+        response.url = url
+        response.headers = rq.structures.CaseInsensitiveDict(headers)
+        response.encoding = 'utf-8'
+        response._content = text.encode('utf-8')
+        response.request = request
+        return response
+
+
+class AsyncEngine:
+    """
+    Class to download problem pages with asyncio, as an alternative to
+    sending each request from its own thread
+    Ctrl-C cancels the download at its next await. Test cases are stored
+    between awaits, so a problem is either stored completely or not at all
+    """
+
+    def __init__(self, platform):
+        self.platform = platform
+        self.cancelled = False
+        self.stored = 0
+
+    def run(self, coroutine):
+        """
+        Method to run a download to completion
+        Returns its result, or None if it was cancelled
+        """
+        if aiohttp is None:
+            print('The asyncio engine needs aiohttp. Run \'pip install aiohttp\' to install it.')
+            sys.exit(0)
+
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(coroutine)
+        loop.add_signal_handler(signal.SIGINT, task.cancel)
+
+        try:
+            return loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            return None
+        finally:
+            loop.remove_signal_handler(signal.SIGINT)
+            loop.close()
+
+    def session(self):
+        """
+        Method to create the HTTP session for a download
+        """
+        connect_timeout, read_timeout = Utilities.get_timeout()
+        connector = aiohttp.TCPConnector(
+            limit_per_host=int(Utilities.get_constant('max_connections_per_host', 4)))
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def fetch(self, session, url, headers=None):
+        """
+        Method to fetch a page within the rate limits of its host
+        Failed requests are retried with exponential backoff, up to max_retries
+        times, like the retries of the threaded engine
+        Every response of an overloaded host slows down the rate limiter, and
+        is retried only once the limiter allows
+        Returns the page and the headers of its response, or None if the page
+        could not be fetched
+        """
+        limiter = Utilities.get_rate_limiter(url)
+        max_attempts = 1 + int(Utilities.get_constant('max_retries', 3))
+
+        archive = Utilities.archive
+        page = None
+        for attempt in range(max_attempts):
+            wait = limiter.take()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = limiter.take()
+
+            delay = 0.5 * 2 ** attempt
+            try:
+                if archive is not None and archive.replaying:
+                    await asyncio.sleep(archive.latency)
+                    final_url, status, response_headers, text = archive.replay_redirects(url, headers or {})
+                else:
+                    async with session.get(url, headers=headers) as response:
+                        text = await response.text()
+                    final_url, status, response_headers = str(response.url), response.status, response.headers
+                    if archive is not None:
+                        archive.record(url, final_url, status, response_headers, text)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await asyncio.sleep(delay)
+                continue
+
+            page = Page(final_url, text, status)
+            if status in RateLimiter.overloaded_statuses:
+                limiter.update(status, response_headers)
+                continue
+            if status not in Utilities.retry_statuses:
+                break
+            if attempt + 1 < max_attempts:
+                await asyncio.sleep(delay)
+
+        if page is None or page.status_code in RateLimiter.overloaded_statuses:
+            return None
+
+        limiter.update(page.status_code, response_headers)
+        if page.status_code in Utilities.retry_statuses:
+            return None
+        return page, response_headers
+
+    async def download_page(self, url, headers=None):
+        """
+        Method to download a single page
+        """
+        async with self.session() as session:
+            return await self.fetch(session, url, headers)
+
+    async def download_contest(self, links):
+        """
+        Method to download, parse and store all problem pages of a contest
+        Returns the links which could not be fetched
+        """
+        platform = self.platform
+        loop = asyncio.get_event_loop()
+        failed_requests = []
+
+        async def download(session, parser, link):
+            fetched = await self.fetch(session, link, Utilities.get_validators(link))
+            if fetched is None or fetched[0].status_code not in (200, 304):
+                failed_requests.append(link)
+                return
+
+            page, headers = fetched
+            page = platform.revalidate(link, page)
+            if page is None:
+                return
+
+            args = platform.get_parser_args(link)
+            result = await loop.run_in_executor(parser, parse_page, args, page)
+            if result is None:
+                platform.discard_problem(args['problem'])
+                return
+
+            problem, inputs, outputs, limits = result
+            Utilities.check_cache(platform.site, platform.contest, problem)
+            Utilities.store_files(
+                platform.site, platform.contest, problem, inputs, outputs, limits)
+            Utilities.save_response(link, page, headers, platform.site, platform.contest, problem)
+            self.stored += 1
+
+        with Utilities.get_parser_pool(len(links)) as parser:
+            async with self.session() as session:
+                await asyncio.gather(*[download(session, parser, link) for link in links])
+
+        return failed_requests
+
+
+class CasePack:
+    """
+    Class to store all test cases of a problem in a single file, which is
+    read through mmap
+    The file starts with a header and a table of the offset, length and
+    compression of every input and output, followed by their contents
+    """
+
+    filename = 'cases.pack'
+    magic = b'ACPK'
+    version = 2
+    header = struct.Struct('<4sIII')
+    entries = {1: struct.Struct('<QQ'), 2: struct.Struct('<QQ?')}
+
+    # Cleared when the platform cannot sendfile into a pipe
+    sendfile = hasattr(os, 'sendfile')
+
+    def __init__(self, path):
+        self.file = open(os.path.join(path, CasePack.filename), 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.num_inputs, self.num_outputs = CasePack.header.unpack_from(self.data, 0)
+        if magic != CasePack.magic or version not in CasePack.entries:
+            self.close()
+            raise ValueError('Not a test case pack: %s' % (path))
+
+        # Packs of version 1 are not compressed
+        entry = CasePack.entries[version]
+        self.table = [(entry.unpack_from(self.data, CasePack.header.size + i * entry.size) + (False,))[:3]
+                      for i in range(self.num_inputs + self.num_outputs)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def open(path):
+        """
+        Method to open the pack of a problem
+        Returns None if its test cases are stored as single files
+        """
+        if not os.path.isfile(os.path.join(path, CasePack.filename)):
+            return None
+        return CasePack(path)
+
+    @staticmethod
+    def write(path, inputs, outputs, threshold):
+        """
+        Method to pack the test cases of a problem
+        Cases of threshold bytes or more are gzipped
+        """
+        cases = [Utilities.encode_case(case, threshold) for case in inputs + outputs]
+        entry = CasePack.entries[CasePack.version]
+
+        offset = CasePack.header.size + entry.size * len(cases)
+        table = []
+        for case, compressed in cases:
+            table += [entry.pack(offset, len(case), compressed)]
+            offset += len(case)
+
+        # Written to a temporary file first, so that a pack is never read half written
+        fd, temp_path = tempfile.mkstemp(dir=path, prefix='tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(CasePack.header.pack(CasePack.magic, CasePack.version, len(inputs), len(outputs)))
+            f.write(b''.join(table))
+            for case, _ in cases:
+                f.write(case)
+        os.rename(temp_path, os.path.join(path, CasePack.filename))
+
+    def get(self, kind, i):
+        """
+        Method to get the offset, length and compression of the input or
+        output of a test case
+        """
+        return self.table[i if kind == 'Input' else self.num_inputs + i]
+
+    def read(self, kind, i):
+        """
+        Method to read the input or output of a test case
+        """
+        offset, length, compressed = self.get(kind, i)
+        data = self.data[offset:offset + length]
+        return (gzip.decompress(data) if compressed else data).decode('utf-8')
+
+    def chunks(self, kind, i):
+        """
+        Method to read the input or output of a test case in chunks of bytes
+        """
+        offset, length, compressed = self.get(kind, i)
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS) if compressed else None
+
+        for start in range(offset, offset + length, 1 << 16):
+            chunk = self.data[start:min(start + (1 << 16), offset + length)]
+            yield decompressor.decompress(chunk) if compressed else chunk
+        if compressed:
+            yield decompressor.flush()
+
+    def input_file(self, i):
+        """
+        Method to get a path the input of a test case can be read from,
+        without writing it to a file of its own
+        """
+        return Utilities.pipe_input('Input' + str(i), functools.partial(self.feed, i))
+
+    def feed(self, i, fd):
+        """
+        Method to write the input of a test case into a pipe
+        """
+        offset, length, compressed = self.get('Input', i)
+
+        if compressed:
+            decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+            for start in range(offset, offset + length, 1 << 16):
+                end = min(start + (1 << 16), offset + length)
+                Utilities.write_all(fd, decompressor.decompress(self.data[start:end]))
+            Utilities.write_all(fd, decompressor.flush())
+            return
+
+        while length > 0:
+            sent = self.send(fd, offset, length)
+            offset += sent
+            length -= sent
+
+    def send(self, fd, offset, length):
+        """
+        Method to write part of the pack into a file descriptor
+        Returns the number of bytes written
+        """
+        if CasePack.sendfile:
+            try:
+                # Copied within the kernel
+                return os.sendfile(fd, self.file.fileno(), offset, length)
+            except OSError as e:
+                if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP):
+                    raise
+                CasePack.sendfile = False
+
+        with memoryview(self.data) as view:
+            return os.write(fd, view[offset:offset + min(length, 1 << 16)])
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+class OutputCapture:
+    """
+    Class to capture the output of a solution in memory, through a named
+    pipe in a private temporary directory
+    Output beyond `output_memory_limit` megabytes is spilled to a file in
+    the same directory
+    """
+
+    def __init__(self, directory, name):
+        self.path = os.path.join(directory, name)
+        os.mkfifo(self.path, 0o600)
+
+        self.limit = float(Utilities.get_constant('output_memory_limit', 16)) * 1024 * 1024
+        self.buffers = []
+        self.size = 0
+        self.spill = None
+
+        self.reader = threading.Thread(target=self.read_all)
+        self.reader.daemon = True
+        self.reader.start()
+
+    def read_all(self):
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            for chunk in iter(lambda: os.read(fd, 1 << 16), b''):
+                if self.spill is None and self.size + len(chunk) > self.limit:
+                    self.spill = open(self.path + '.spill', 'w+b')
+                    self.spill.write(b''.join(self.buffers))
+                    self.buffers = []
+
+                if self.spill is None:
+                    self.buffers.append(chunk)
+                else:
+                    self.spill.write(chunk)
+                self.size += len(chunk)
+        finally:
+            os.close(fd)
+
+    def wait(self, timeout=1):
+        """
+        Method to wait until everything written has been captured
+        """
+        deadline = time.monotonic() + timeout
+        while self.reader.is_alive() and time.monotonic() < deadline:
+            # The reader waits for a writer if the output was never opened
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+                os.close(fd)
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+            self.reader.join(0.01)
+
+    def open(self):
+        """
+        Method to open the captured output for reading as bytes
+        """
+        self.wait()
+        if self.spill is None:
+            return io.BytesIO(b''.join(self.buffers))
+        self.spill.flush()
+        return open(self.spill.name, 'rb')
+
+    @contextlib.contextmanager
+    def file(self):
         """
-        inputs = []
+        Method to get a path the captured output can be read from
+        """
+        self.wait()
+        if self.spill is not None:
+            self.spill.flush()
+            yield self.spill.name
+            return
 
-        for i in range(num_cases):
-            with open(os.path.join(path, 'Input' + str(i)), 'r') as fh:
-                inputs += [fh.read()]
+        def feed(fd):
+            for chunk in self.buffers:
+                Utilities.write_all(fd, chunk)
 
-        return inputs
+        with Utilities.pipe_input(os.path.basename(self.path), feed) as output_file:
+            yield output_file
 
-    @staticmethod
-    def cleanup(num_cases, basename, extension):
+    def chunks(self):
         """
-        Method to clean up temporarily created files
+        Method to read the captured output in chunks of bytes
         """
-        for i in range(num_cases):
-            if os.path.isfile('temp_output' + str(i)):
-                os.remove('temp_output' + str(i))
-
-        if extension == 'java':
-            os.system('rm ' + basename + '*.class')
-        if extension == 'cpp':
-            os.system('rm ' + basename)
+        with self.open() as f:
+            yield from iter(lambda: f.read(1 << 16), b'')
 
-    @staticmethod
-    def handle_kbd_interrupt(site, contest, problem):
+    def read(self):
         """
-        Method to handle keyboard interrupt
+        Method to get the captured output as text
         """
-        from shutil import rmtree
-        print('Cleaning up...')
+        with self.open() as f:
+            return f.read().decode('utf-8', errors='replace')
 
-        # Handle case for SPOJ specially as it does not have contests
-        contest = '' if site == 'spoj' else contest
+    def close(self):
+        self.buffers = []
+        if self.spill is not None:
+            self.spill.close()
 
-        if problem is not None:
-            path = os.path.join(Utilities.cache_dir, site, contest, problem)
-            if os.path.isdir(path):
-                rmtree(path)
-        else:
-            path = os.path.join(Utilities.cache_dir, site, contest)
-            if os.path.isdir(path):
-                rmtree(path)
 
-        print('Done. Exiting gracefully.')
+class Launcher:
+    """
+    Class to start solutions through a small native process, which forks
+    them, applies the limits and reports their resource usage
+    The peak memory reported by the kernel includes whatever the parent of
+    an exec'd process had mapped, so forking from the launcher instead of
+    from this interpreter keeps the reported memory close to the solution's
+    """
+
+    name = 'launcher'
+
+    # Usage: launcher <report fd> <time limit> <address space limit or 0> <command...>
+    # Writes "<wait status> <wall seconds> <cpu seconds> <peak rss bytes>" to the report fd
+    source = 'launcher.c'
+
+    lock = threading.Lock()
+    instance = None
+    compiled = False
+
+    def __init__(self, binary):
+        self.binary = binary
 
     @staticmethod
-    def run_solution(args):
+    def get():
         """
-        Method to run and test the user's solution against sample cases
+        Method to get the launcher, compiling it on first use
+        Returns None if it could not be compiled
         """
-        problem = args['source']
+        with Launcher.lock:
+            if not Launcher.compiled:
+                Launcher.compiled = True
+                source_file = Utilities.write_harness(Launcher.source)
+                status, build_dir = Utilities.compile_solution(
+                    'c', source_file, Launcher.name, ['cc', '-O2'])
+                if status == 0:
+                    Launcher.instance = Launcher(os.path.join(build_dir, Launcher.name))
+
+        return Launcher.instance
+
+    def run(self, execute_command, input_file, output_file, error_file, time_limit, address_limit):
+        """
+        Method to run the solution against a single test case
+        Returns the exit status along with the wall time, CPU time
+        and peak memory used by the solution
+        """
+        read_fd, write_fd = os.pipe()
+        with open(input_file, 'r') as stdin, open(output_file, 'w') as stdout, \
+                open(error_file, 'w') as stderr:
+            proc = subprocess.Popen([self.binary, str(write_fd), str(time_limit), str(address_limit or 0)] +
+                                    execute_command, stdin=stdin, stdout=stdout, stderr=stderr,
+                                    pass_fds=(write_fd,))
+            os.close(write_fd)
+            # The launcher enforces the limit itself, this only guards against it hanging
+            timer = threading.Timer(time_limit + 1, proc.kill)
+            timer.start()
+            with os.fdopen(read_fd, 'r') as report:
+                report = report.read().split()
+            proc.wait()
+            timer.cancel()
+
+        if len(report) != 4:
+            return {'status': proc.returncode << 8 if proc.returncode > 0 else 1 << 8,
+                    'timed_out': proc.returncode == -signal.SIGKILL,
+                    'wall': None, 'cpu': None, 'rss': None}
+
+        wall = float(report[1])
+        return {
+            'status': int(report[0]),
+            'timed_out': wall > time_limit,
+            'wall': wall,
+            'cpu': float(report[2]),
+            'rss': int(report[3]),
+        }
+
+
+class JavaHarness:
+    """
+    Class to run a compiled Java solution against several test cases
+    inside a single long-lived JVM, so that JVM startup is paid only once
+    """
 
-        extension = problem.split('.')[-1]
-        problem = problem.split('.')[0]
-        basename = problem.split('/')[-1]
-        problem_path = os.path.join(os.getcwd(), problem)
+    class_name = 'ACedItHarness'
 
-        if not os.path.isfile(problem_path + '.' + extension):
-            print('ERROR : No such file')
-            sys.exit(0)
+    # Each line on the commands pipe names an input, an output and an error
+    # file, and "<exit status> <wall ns> <cpu ns> <peak heap bytes>" is
+    # reported back on the reports pipe
+    source = class_name + '.java'
+    report_pattern = re.compile(r'-?\d+ \d+ \d+ \d+$')
 
-        problem_code = args['problem'] if args['problem'] else basename
-        contest_code = '' if args['site'] == 'spoj' else args['contest']
+    # Set once a harness could not be started, e.g. because the JVM cannot
+    # trap System.exit. Test cases are run in a JVM of their own from then on
+    unsupported = False
+    lock = threading.Lock()
 
-        testcases_path = os.path.join(Utilities.cache_dir, args[
-                                      'site'], contest_code, problem_code)
+    def __init__(self, build_dir, basename, memory_limit):
+        self.build_dir = build_dir
+        self.basename = basename
+        self.memory_limit = memory_limit
+        self.proc = None
+        self.commands = None
+        self.reports = None
 
-        if os.path.isdir(testcases_path):
-            num_cases = len(os.listdir(testcases_path)) // 2
-            results, expected_outputs, user_outputs = [], [], []
+    @staticmethod
+    def compile():
+        """
+        Method to compile the harness, reusing the build cache
+        """
+        source_file = Utilities.write_harness(JavaHarness.source)
+        return Utilities.compile_solution('java', source_file, JavaHarness.class_name)
 
-            if extension in ['c', 'cpp', 'java', 'py', 'hs', 'rb']:
+    @staticmethod
+    def get_jvm_flags():
+        """
+        Method to get the flags needed to start the harness JVM
+        """
+        flags = list(Utilities.java_flags)
+
+        # From Java 12 a security manager can only be installed at runtime
+        # when explicitly allowed. Older JVMs would treat this as a class name,
+        # and from Java 24 the JVM refuses to start with it
+        match = re.search(r'version "(\d+)(?:\.(\d+))?', Utilities.get_compiler_version(['java']))
+        if match:
+            major = int(match.group(1))
+            if major == 1 and match.group(2):
+                major = int(match.group(2))
+            if 12 <= major < 24:
+                flags += ['-Djava.security.manager=allow']
 
-                # Compiler flags taken from http://codeforces.com/blog/entry/79
-                compiler = {
-                    'hs': 'ghc --make -O -dynamic -o ' + basename,
-                    'py': None,
-                    'rb': None,
-                    'c': '/usr/local/bin/gcc-9 -DONLINE_JUDGE -fno-asm -lm -O2 -o ' + basename,
-                    'cpp': '/usr/local/bin/g++-9 -DONLINE_JUDGE -lm -x c++ -O2 -std=c++14 -o ' + basename,
-                    'java': 'javac -d .'
-                }[extension]
-
-                execute_command = {
-                    'py': 'python \'' + problem_path + '.' + extension + '\'',
-                    'rb': 'ruby \'' + problem_path + '.' + extension + '\'',
-                    'hs': './' + basename,
-                    'c': './' + basename,
-                    'cpp': './' + basename,
-                    'java': 'java -DONLINE_JUDGE=true -Duser.language=en -Duser.region=US -Duser.variant=US ' + basename
-                }[extension]
-
-                if compiler is None:
-                    compile_status = 0
+        return flags
+
+    def start(self):
+        """
+        Method to boot the JVM and wait until the harness is ready
+        Returns False if the harness could not be started
+        """
+        status, harness_build_dir = JavaHarness.compile()
+        if status != 0:
+            raise RuntimeError('Could not compile the Java harness')
+
+        # The harness is controlled through pipes of its own, as the solution
+        # may write to the stdout of the JVM directly
+        commands_read, commands_write = os.pipe()
+        reports_read, reports_write = os.pipe()
+        try:
+            self.proc = subprocess.Popen(
+                ['java', '-Xmx%dm' % (self.memory_limit // (1024 * 1024))] + JavaHarness.get_jvm_flags() +
+                ['-cp', harness_build_dir, JavaHarness.class_name, self.build_dir, self.basename,
+                 '/dev/fd/%d' % commands_read, '/dev/fd/%d' % reports_write],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, pass_fds=(commands_read, reports_write))
+        except OSError:
+            os.close(commands_write)
+            os.close(reports_read)
+            raise
+        finally:
+            os.close(commands_read)
+            os.close(reports_write)
+        self.commands = os.fdopen(commands_write, 'w')
+        self.reports = os.fdopen(reports_read, 'r')
+
+        ready = self.reports.readline().strip()
+        if ready == 'ready':
+            return True
+
+        self.stop()
+        with JavaHarness.lock:
+            if not JavaHarness.unsupported:
+                JavaHarness.unsupported = True
+                if ready == 'unsupported':
+                    print('This JVM cannot trap System.exit, so each test case is run in a JVM of its own.')
                 else:
-                    compile_status = os.system(
-                        compiler + ' \'' + problem_path + '.' + extension + '\'')
+                    print('Could not start the Java harness, so each test case is run in a JVM of its own.')
+        return False
 
-                if compile_status == 0:
+    def run(self, input_file, output_file, error_file, time_limit, memory_limit):
+        """
+        Method to run the solution against a single test case
+        Returns the exit status along with the wall time, CPU time and
+        peak heap used by the solution, excluding JVM startup
+        The memory limit is applied to the whole JVM when it is started
+        Returns None if the harness cannot be used, and the test case is to
+        be run in a JVM of its own
+        """
+        if JavaHarness.unsupported:
+            return None
+        if self.proc is None or self.proc.poll() is not None:
+            if self.proc is not None:
+                self.stop()
+            if not self.start():
+                return None
+
+        proc, killed = self.proc, threading.Event()
+
+        def kill():
+            killed.set()
+            proc.kill()
+
+        timer = threading.Timer(time_limit, kill)
+        timer.start()
+        try:
+            self.commands.write('\t'.join([input_file, output_file, error_file]) + '\n')
+            self.commands.flush()
+            report = self.reports.readline()
+        except BrokenPipeError:
+            report = ''
+        timer.cancel()
+
+        if JavaHarness.report_pattern.match(report):
+            status, wall, cpu, peak = [int(value) for value in report.split()]
+            return {
+                'status': (status & 0xff) << 8,
+                'timed_out': wall / 1e9 > time_limit,
+                'wall': wall / 1e9,
+                'cpu': cpu / 1e9,
+                'rss': peak,
+            }
+
+        # The JVM died or broke the protocol while running this case, a new
+        # one is started for the next
+        returncode = self.stop()
+        return {
+            'status': returncode << 8 if returncode > 0 else 1 << 8,
+            'timed_out': killed.is_set(),
+            'wall': None,
+            'cpu': None,
+            'rss': None,
+        }
+
+    def stop(self):
+        """
+        Method to kill the JVM
+        Returns its exit status
+        """
+        self.proc.kill()
+        returncode = self.proc.wait()
+        try:
+            self.commands.close()
+        except BrokenPipeError:
+            # A command the JVM died before reading
+            pass
+        self.reports.close()
+        self.proc = None
+        return returncode
+
+    def close(self):
+        """
+        Method to shut down the JVM
+        Threads left running by the solution would keep it alive, so it is
+        killed if it does not exit soon after it is told to
+        """
+        if self.proc is None:
+            return
 
-                    # Compiled successfully
-                    timeout_command = 'timeout' if platform.system() == 'Linux' else 'gtimeout'
-                    for i in range(num_cases):
-                        status = os.system(timeout_command + ' 2s ' + execute_command + ' < ' + os.path.join(
-                            testcases_path, 'Input' + str(i)) + ' > temp_output' + str(i))
-
-                        with open(os.path.join(testcases_path, 'Output' + str(i)), 'r') as out_handler:
-                            expected_output = out_handler.read().strip().split('\n')
-                            expected_output = '\n'.join(
-                                [line.strip() for line in expected_output])
-                            expected_outputs += [expected_output]
-
-                            if status == 31744:
-                                # Time Limit Exceeded
-                                results += [Utilities.colors['BOLD'] + Utilities.colors[
-                                    'YELLOW'] + 'TLE' + Utilities.colors['ENDC']]
-                                user_outputs += ['']
+        try:
+            self.commands.close()
+            self.proc.wait(timeout=5)
+        except (BrokenPipeError, subprocess.TimeoutExpired):
+            pass
+        self.stop()
 
-                            elif status == 0:
-                                # Ran successfully
-                                with open('temp_output' + str(i), 'r') as temp_handler:
-                                    user_output = temp_handler.read().strip().split('\n')
-                                    user_output = '\n'.join(
-                                        [line.strip() for line in user_output])
-                                    user_outputs += [user_output]
-
-                                if expected_output == user_output:
-                                    # All Correct
-                                    results += [Utilities.colors['BOLD'] + Utilities.colors[
-                                        'GREEN'] + 'AC' + Utilities.colors['ENDC']]
-                                else:
-                                    # Wrong Answer
-                                    results += [Utilities.colors['BOLD'] + Utilities.colors[
-                                        'RED'] + 'WA' + Utilities.colors['ENDC']]
 
-                            else:
-                                # Runtime Error
-                                results += [Utilities.colors['BOLD'] +
-                                            Utilities.colors['RED'] + 'RTE' + Utilities.colors['ENDC']]
-                                user_outputs += ['']
-                else:
-                    # Compilation error occurred
-                    message = Utilities.colors['BOLD'] + Utilities.colors[
-                        'RED'] + 'Compilation error. Not run against test cases' + Utilities.colors['ENDC'] + '.'
-                    print(message)
-                    sys.exit(0)
+class ForkServer:
+    """
+    Class to run a Python or Ruby solution against several test cases by
+    forking a pre-started interpreter which has already compiled the
+    solution and loaded the modules it imports
+    """
 
-            else:
-                print('Supports only C, C++, Python, Java, Ruby and Haskell as of now.')
-                sys.exit(0)
+    # Each line on stdin holds an input file, an output file, an error file,
+    # a time limit and a memory limit. A child is forked per line, and
+    # "<wait status> <wall seconds> <cpu seconds> <peak rss bytes>" is
+    # reported back, with -1 for anything that could not be measured
+    sources = {'py': 'forkserver.py', 'rb': 'forkserver.rb'}
 
-            from terminaltables import AsciiTable
-            table_data = [['Serial No', 'Input',
-                           'Expected Output', 'Your Output', 'Result']]
+    def __init__(self, extension, source_file, interpreter):
+        self.extension = extension
+        self.source_file = source_file
+        self.interpreter = interpreter if extension == 'py' else 'ruby'
+        self.proc = None
 
-            inputs = Utilities.input_file_to_string(testcases_path, num_cases)
+    def start(self):
+        """
+        Method to start the interpreter and wait until the solution is loaded
+        """
+        server_file = Utilities.write_harness(ForkServer.sources[self.extension])
 
-            for i in range(num_cases):
+        self.proc = subprocess.Popen(
+            [self.interpreter, server_file, self.source_file],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
+        self.proc.stdout.readline()
 
-                row = [
-                    i + 1,
-                    inputs[i],
-                    expected_outputs[i],
-                    user_outputs[i] if any(sub in results[i]
-                                           for sub in ['AC', 'WA']) else 'N/A',
-                    results[i]
-                ]
+    def run(self, input_file, output_file, error_file, time_limit, memory_limit):
+        """
+        Method to run the solution against a single test case
+        Returns the exit status along with the wall time, CPU time and
+        peak memory used by the solution, excluding interpreter startup
+        """
+        if self.proc is None or self.proc.poll() is not None:
+            self.start()
+
+        proc = self.proc
+        # The server enforces the limit itself, this only guards against it hanging
+        timer = threading.Timer(time_limit + 1, proc.kill)
+        proc.stdin.write('\t'.join([input_file, output_file, error_file,
+                                     str(time_limit), str(memory_limit)]) + '\n')
+        proc.stdin.flush()
+        timer.start()
+        report = proc.stdout.readline().split()
+        timer.cancel()
+
+        if len(report) != 4:
+            proc.wait()
+            self.proc = None
+            return {'status': 1 << 8, 'timed_out': True, 'wall': None, 'cpu': None, 'rss': None}
+
+        status, rss = int(report[0]), int(report[3])
+        return {
+            'status': status,
+            'timed_out': os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGALRM,
+            'wall': float(report[1]),
+            'cpu': float(report[2]),
+            'rss': rss if rss >= 0 else None,
+        }
+
+    def close(self):
+        """
+        Method to shut down the interpreter
+        """
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+        self.proc = None
 
-                table_data.append(row)
 
-            table = AsciiTable(table_data)
+# The parts of a response needed by the parsers, which can be sent to a worker process
+Page = namedtuple('Page', ['url', 'text', 'status_code'])
 
-            print(table.table)
 
-            # Clean up temporary files
-            Utilities.cleanup(num_cases, basename, extension)
+def parse_page(args, page):
+    """
+    Function to parse a problem page fetched during a contest download
+    Runs in a worker process. Returns None if the page could not be parsed
+    """
+    platform = Utilities.get_platform(args)
 
-        else:
-            print('Test cases not found locally...')
+    try:
+        if platform.problem is None:
+            platform.problem = platform.get_problem_name(page)
+        inputs, outputs, limits = platform.parse_html(page)
+    except SystemExit:
+        return None
 
-            args['problem'] = problem_code
-            args['force'] = True
-            args['source'] = problem + '.' + extension
+    return platform.problem, inputs, outputs, limits
 
-            Utilities.download_problem_testcases(args)
 
-            print('Running your solution against sample cases...')
-            Utilities.run_solution(args)
+class SampleExtractor(HTMLParser):
+    """
+    Class to extract the <pre> blocks of a page in a single pass, without
+    building a tree of the whole page
+    Entities are decoded, <br> becomes a newline and other tags are dropped.
+    Each block keeps its ancestors, the last <h3> before it, the text of each
+    <span> in it and its text split at <b>Input</b> and <b>Output</b>
+    """
+
+    void_elements = set(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                         'link', 'meta', 'param', 'source', 'track', 'wbr'])
+
+    def __init__(self, classes=(), collect_text=False):
+        super(SampleExtractor, self).__init__(convert_charrefs=True)
+        self.texts = dict((name, []) for name in classes)
+        self.text = [] if collect_text else None
+        self.blocks = []
+        self.stack = []
+        self.serial = 0
+        self.collecting = []
+        self.heading = None
+        self.last_heading = ''
+        self.block = None
+        self.span = None
+        self.bold = None
 
     @staticmethod
-    def get_html(url):
+    def extract(text, classes=(), collect_text=False):
         """
-        Utility function get the html content of an url
+        Method to scan a page
+        classes are the classes of the elements to collect the text of
         """
-        sys.setrecursionlimit(10000)
-        MAX_TRIES = 3
-        try:
-            for try_count in range(MAX_TRIES):
-                r = rq.get(url)
-                if r.status_code == 200:
+        extractor = SampleExtractor(classes, collect_text)
+        extractor.feed(text)
+        extractor.close()
+        return extractor
+
+    def select(self, name):
+        """
+        Method to get the first block inside each element with class name
+        """
+        blocks, seen = [], set()
+        for block in self.blocks:
+            for _, classes, serial in reversed(block['ancestors']):
+                if name in classes:
+                    if serial not in seen:
+                        seen.add(serial)
+                        blocks += [block]
                     break
-            if try_count >= MAX_TRIES:
-                print('Could not fetch content. Please try again.')
-                sys.exit(0)
-        except Exception as e:
-            print('Please check your internet connection and try again.')
-            sys.exit(0)
-        return r
+        return blocks
+
+    def add(self, data):
+        block = self.block
+        block['text'].append(data)
+        if self.span is not None:
+            self.span.append(data)
+        if self.bold is not None:
+            self.bold.append(data)
+        else:
+            block['segments'][-1].append(data)
+
+    def handle_starttag(self, tag, attrs):
+        if self.block is not None:
+            if tag == 'br':
+                self.add('\n')
+            elif tag == 'span':
+                self.span = []
+            elif tag == 'b':
+                self.bold = []
+
+        if tag in SampleExtractor.void_elements:
+            return
+
+        classes = frozenset(' '.join(value for name, value in attrs
+                                     if name == 'class' and value).split())
+        self.serial += 1
+        self.stack.append((tag, classes, self.serial))
+        self.collecting += [name for name in classes if name in self.texts]
+
+        if tag == 'h3':
+            self.heading = []
+        elif tag == 'pre' and self.block is None:
+            self.block = {'ancestors': self.stack[:-1], 'heading': self.last_heading,
+                          'text': [], 'spans': [], 'segments': [[]], 'markers': []}
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in SampleExtractor.void_elements:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Elements left open inside this one are closed along with it
+        if not any(entry[0] == tag for entry in self.stack):
+            return
+
+        while True:
+            name, classes, _ = self.stack.pop()
+            for cls in classes:
+                if cls in self.texts:
+                    self.collecting.remove(cls)
+            self.close_element(name)
+            if name == tag:
+                break
+
+    def close_element(self, tag):
+        block = self.block
+
+        if tag == 'h3' and self.heading is not None:
+            self.last_heading = ''.join(self.heading).strip()
+            self.heading = None
+        elif block is None:
+            return
+        elif tag == 'pre':
+            block['text'] = ''.join(block['text'])
+            block['segments'] = [''.join(segment) for segment in block['segments']]
+            self.blocks += [block]
+            self.block = None
+        elif tag == 'span' and self.span is not None:
+            block['spans'] += [''.join(self.span)]
+            self.span = None
+        elif tag == 'b' and self.bold is not None:
+            text = ''.join(self.bold)
+            self.bold = None
+            if text.strip().rstrip(':') in ('Input', 'Output'):
+                block['markers'] += [text.strip().rstrip(':')]
+                block['segments'] += [[]]
+            else:
+                block['segments'][-1].append(text)
+
+    def handle_data(self, data):
+        if self.text is not None:
+            self.text.append(data)
+        if self.heading is not None:
+            self.heading.append(data)
+        for name in self.collecting:
+            self.texts[name].append(data)
+        if self.block is not None:
+            self.add(data)
+
+    def get_text(self, name=None):
+        """
+        Method to get the text of the elements with class name, or of the whole page
+        """
+        return ''.join(self.text if name is None else self.texts[name])
 
 
 class Platform:
@@ -451,59 +3466,219 @@ class Platform:
         self.site = args['site']
         self.contest = args['contest']
         self.force_download = args['force']
-        self.responses = []
-        self.lock = threading.Lock()
+        self.engine = args.get('engine', 'threads')
+        # Set when parsing in a worker process, which leaves the cache to the main process
+        self.worker = args.get('worker', False)
+        # Names of the problems found by get_problem_links, by link
+        self.problem_names = {}
 
     def get_problem_name(self, response):
         return response.url.split('/')[-1]
 
+    def get_link_name(self, link):
+        """
+        Method to get the name of the problem at a link from the contest page
+        """
+        return self.problem_names.get(link, link.split('/')[-1])
+
+    def get_parser_args(self, link):
+        """
+        Method to get the args to parse the page at a link with in a worker process
+        Problems not named by the contest page are named from their page by
+        get_problem_name
+        """
+        return {'site': self.site, 'contest': self.contest,
+                'problem': self.problem_names.get(link), 'force': self.force_download, 'worker': True}
+
     def build_problem_url(self):
         raise NotImplementedError
 
-    def parse_html(self):
+    def parse_html(self, req):
+        """
+        Method to parse the html and get test cases
+        The page is scanned once by extract_samples, and only parsed with
+        BeautifulSoup by parse_soup if its layout is not recognised
+        """
+        samples = self.extract_samples(req)
+        if samples is None:
+            return self.parse_soup(req)
+        return samples
+
+    def extract_samples(self, req):
+        """
+        Method to get test cases with a SampleExtractor
+        Returns None if the layout of the page is not recognised
+        """
+        return None
+
+    def parse_soup(self, req):
         raise NotImplementedError
 
+    def problem_not_found(self):
+        """
+        Method to give up on a problem page which could not be parsed
+        In a worker process, the main process reports it and cleans up
+        """
+        if not self.worker:
+            print('Problem not found..')
+            Utilities.handle_kbd_interrupt(
+                self.site, self.contest, self.problem)
+        sys.exit(0)
+
+    def discard_problem(self, problem):
+        """
+        Method to clean up after a problem page which could not be parsed in
+        a worker process
+        """
+        print('Problem not found..')
+        if problem is not None:
+            Utilities.handle_kbd_interrupt(self.site, self.contest, problem)
+
+    def parse_limits(self, time_text, memory_text):
+        """
+        Method to convert the limits shown on a problem page, e.g. '2 seconds'
+        and '256 megabytes', to seconds and megabytes
+        """
+        limits = {}
+
+        match = re.search(r'(\d+(?:\.\d+)?)\s*(ms)?', (time_text or '').lower())
+        if match:
+            limits['time_limit'] = float(match.group(1)) / (1000 if match.group(2) else 1)
+
+        match = re.search(r'(\d+(?:\.\d+)?)\s*([kmg])?', (memory_text or '').lower())
+        if match:
+            limits['memory_limit'] = int(float(match.group(1)) * {'k': 1.0 / 1024, 'g': 1024}.get(match.group(2), 1))
+
+        return limits
+
+    def get_page(self, url, headers=None):
+        """
+        Method to fetch a single page with the selected engine
+        Returns the page and the headers of its response
+        """
+        if self.engine != 'asyncio':
+            r = Utilities.get_html(url, headers)
+            return Page(r.url, r.text, r.status_code), r.headers
+
+        engine = AsyncEngine(self)
+        fetched = engine.run(engine.download_page(url, headers))
+        if engine.cancelled:
+            raise KeyboardInterrupt
+        if fetched is None:
+            print('Could not fetch content. Please try again.')
+            sys.exit(0)
+        return fetched
+
+    def revalidate(self, link, page):
+        """
+        Method to resolve a response to a conditional request
+        Returns the cached page if it was not modified, or None if its test
+        cases are stored as well and need not be parsed again
+        """
+        if page.status_code != 304:
+            return page
+
+        entry = Utilities.load_response(link)
+        problem = entry.get('problem')
+        if problem is not None and Utilities.has_testcases(self.site, self.contest, problem):
+            return None
+
+        return Page(entry['url'], entry['text'], 200)
+
     def scrape_problem(self):
         """
         Method to scrape a single problem
         """
         contest = '' if self.site == 'spoj' else self.contest
         print('Fetching problem %s-%s from %s...' % (contest, self.problem, self.site))
-        req = Utilities.get_html(self.build_problem_url())
-        inputs, outputs = self.parse_html(req)
+        url = self.build_problem_url()
+        page, headers = self.get_page(url, Utilities.get_validators(url))
+        page = self.revalidate(url, page)
+        if page is None:
+            print('Test cases are up to date.')
+            return
+
+        inputs, outputs, limits = self.parse_html(page)
         Utilities.store_files(self.site, self.contest,
-                              self.problem, inputs, outputs)
+                              self.problem, inputs, outputs, limits)
+        Utilities.save_response(url, page, headers, self.site, self.contest, self.problem)
         print('Done.')
 
     def fetch_html(self, link):
-        r = rq.get(link)
-        with self.lock:
-            self.responses += [r]
-
+        """
+        Method to fetch a problem page within the rate limits of its host
+        """
+        limiter = Utilities.get_rate_limiter(link)
+        limiter.acquire()
+        r = None
+        try:
+            r = Utilities.get_session(link, batch=True).get(link, headers=Utilities.get_validators(link),
+                                                timeout=Utilities.get_timeout())
+        except rq.exceptions.RequestException:
+            pass
+        finally:
+            limiter.release(r)
+        return link, r
 
     def handle_batch_requests(self, links):
         """
         Method to send simultaneous requests to all problem pages
+        Each page is parsed in a worker process as soon as it arrives, and
+        its test cases are stored as soon as they are parsed
+        Failed requests are sent again, up to max_retries times
+        Returns the links which could not be fetched
         """
-        threads = [threading.Thread(target=self.fetch_html, args=(link,)) for link in links]
-
-        for t in threads:
-            t.start()
-
-        for t in threads:
-            t.join()
-
+        if len(links) == 0:
+            return []
+
+        concurrency = int(Utilities.get_constant('max_connections_per_host', 4))
+        hosts = set(urlparse(link).netloc for link in links)
+        max_attempts = 1 + int(Utilities.get_constant('max_retries', 3))
+        attempts = dict((link, 1) for link in links)
+        parses = {}
         failed_requests = []
 
-        for response in self.responses:
-            if response is not None and response.status_code == 200:
-                inputs, outputs = self.parse_html(response)
-                self.problem = self.get_problem_name(response)
-                Utilities.check_cache(self.site, self.contest, self.problem)
-                Utilities.store_files(
-                    self.site, self.contest, self.problem, inputs, outputs)
-            else:
-                failed_requests += [response.url]
+        with ThreadPoolExecutor(max_workers=min(len(links), concurrency * len(hosts))) as fetcher, \
+                Utilities.get_parser_pool(len(links)) as parser:
+
+            fetches = set(fetcher.submit(self.fetch_html, link) for link in links)
+            pending = set(fetches)
+
+            while len(pending) > 0:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future in fetches:
+                        fetches.remove(future)
+                        link, response = future.result()
+
+                        if response is not None and response.status_code in (200, 304):
+                            page = self.revalidate(
+                                link, Page(response.url, response.text, response.status_code))
+                            if page is not None:
+                                args = self.get_parser_args(link)
+                                future = parser.submit(parse_page, args, page)
+                                parses[future] = link, page, response.headers, args['problem']
+                                pending.add(future)
+                        elif attempts[link] < max_attempts:
+                            attempts[link] += 1
+                            future = fetcher.submit(self.fetch_html, link)
+                            fetches.add(future)
+                            pending.add(future)
+                        else:
+                            failed_requests += [link]
+
+                    else:
+                        link, page, headers, problem = parses.pop(future)
+                        if future.result() is None:
+                            self.discard_problem(problem)
+                            continue
+
+                        self.problem, inputs, outputs, limits = future.result()
+                        Utilities.check_cache(self.site, self.contest, self.problem)
+                        Utilities.store_files(
+                            self.site, self.contest, self.problem, inputs, outputs, limits)
+                        Utilities.save_response(link, page, headers, self.site, self.contest, self.problem)
 
         return failed_requests
 
@@ -512,20 +3687,34 @@ class Platform:
         Method to scrape all problems from a given contest
         """
         print('Checking problems available for contest %s-%s...' % (self.site, self.contest))
-        req = Utilities.get_html(self.build_contest_url())
+        req, _ = self.get_page(self.build_contest_url())
         links = self.get_problem_links(req)
 
         print('Found %d problems..' % (len(links)))
 
         if not self.force_download:
-            cached_problems = os.listdir(os.path.join(
-                Utilities.cache_dir, self.site, self.contest))
-            links = [link for link in links if link.split(
-                '/')[-1] not in cached_problems]
+            cached_links = set()
+            for link in links:
+                hit = Utilities.has_testcases(self.site, self.contest, self.get_link_name(link))
+                Utilities.record_lookup(self.site, self.contest, self.get_link_name(link), hit)
+                if hit:
+                    cached_links.add(link)
+            links = [link for link in links if link not in cached_links]
+
+        if self.engine == 'asyncio':
+            engine = AsyncEngine(self)
+            failed_requests = engine.run(engine.download_contest(links))
+            if engine.cancelled:
+                # Nothing is left half written, so the problems done so far are kept
+                print('Cancelled. Kept %d problems downloaded completely.' % (engine.stored))
+                return
+        else:
+            failed_requests = self.handle_batch_requests(links)
 
-        failed_requests = self.handle_batch_requests(links)
         if len(failed_requests) > 0:
-            self.handle_batch_requests(failed_requests)
+            print('Could not fetch %d problems:' % (len(failed_requests)))
+            for link in failed_requests:
+                print(link)
 
 
 class Codeforces(Platform):
@@ -537,7 +3726,23 @@ class Codeforces(Platform):
         self.problem = args['problem']
         super(Codeforces, self).__init__(args)
 
-    def parse_html(self, req):
+    def extract_samples(self, req):
+        """
+        Method to get test cases from a codeforces problem in a single pass
+        """
+        page = SampleExtractor.extract(req.text, ['time-limit', 'memory-limit'])
+
+        inputs = [block['text'] for block in page.select('input')]
+        outputs = [block['text'] for block in page.select('output')]
+
+        if len(inputs) == 0 or len(outputs) == 0:
+            return None
+
+        limits = self.parse_limits(page.get_text('time-limit'), page.get_text('memory-limit'))
+
+        return inputs, outputs, limits
+
+    def parse_soup(self, req):
         """
         Method to parse the html and get test cases
         from a codeforces problem
@@ -548,10 +3753,7 @@ class Codeforces(Platform):
         outputs = soup.findAll('div', {'class': 'output'})
 
         if len(inputs) == 0 or len(outputs) == 0:
-            print('Problem not found..')
-            Utilities.handle_kbd_interrupt(
-                self.site, self.contest, self.problem)
-            sys.exit(0)
+            self.problem_not_found()
 
         repls = ('<br>', '\n'), ('<br/>', '\n'), ('</br>', '')
 
@@ -561,18 +3763,23 @@ class Codeforces(Platform):
             pre = inp.find('pre').decode_contents()
             pre = functools.reduce(lambda a, kv: a.replace(*kv), repls, pre)
             pre = re.sub('<[^<]+?>', '', pre)
-            formatted_inputs += [pre]
+            formatted_inputs += [html.unescape(pre)]
 
         for out in outputs:
             pre = out.find('pre').decode_contents()
             pre = functools.reduce(lambda a, kv: a.replace(*kv), repls, pre)
             pre = re.sub('<[^<]+?>', '', pre)
-            formatted_outputs += [pre]
+            formatted_outputs += [html.unescape(pre)]
+
+        time_limit = soup.find('div', {'class': 'time-limit'})
+        memory_limit = soup.find('div', {'class': 'memory-limit'})
+        limits = self.parse_limits(time_limit and time_limit.get_text(),
+                                   memory_limit and memory_limit.get_text())
 
         # print 'Inputs', formatted_inputs
         # print 'Outputs', formatted_outputs
 
-        return formatted_inputs, formatted_outputs
+        return formatted_inputs, formatted_outputs, limits
 
     def get_problem_links(self, req):
         """
@@ -631,17 +3838,18 @@ class Codechef(Platform):
         from a codechef problem
         """
         try:
-            data = str(json.loads(req.text)['body'])
+            problem = json.loads(req.text)
+            data = str(problem['body'])
         except (KeyError, ValueError):
-            print('Problem not found..')
-            Utilities.handle_kbd_interrupt(
-                self.site, self.contest, self.problem)
-            sys.exit(0)
+            self.problem_not_found()
 
         inputs = self._extract(data, 'example input')
         outputs = self._extract(data, 'example output')
 
-        return inputs, outputs
+        # The API only exposes the time limit
+        limits = self.parse_limits(str(problem.get('max_timelimit', '')), None)
+
+        return inputs, outputs, limits
 
     def get_problem_links(self, req):
         """
@@ -681,7 +3889,36 @@ class Spoj(Platform):
         self.problem = args['problem'].upper()
         super(Spoj, self).__init__(args)
 
-    def parse_html(self, req):
+    def extract_samples(self, req):
+        """
+        Method to get test cases from a spoj problem in a single pass
+        """
+        page = SampleExtractor.extract(req.text)
+
+        if len(page.blocks) == 0:
+            return None
+
+        formatted_inputs, formatted_outputs = [], []
+
+        for block in page.blocks:
+            if block['markers'] != ['Input', 'Output']:
+                return None
+            # The colon may follow the </b> instead of preceding it
+            formatted_inputs += [block['segments'][1].lstrip(':').strip()]
+            formatted_outputs += [block['segments'][2].lstrip(':').strip()]
+
+        return formatted_inputs, formatted_outputs, self.find_limits(req)
+
+    def find_limits(self, req):
+        """
+        Method to get the limits from the table of a spoj problem
+        """
+        time_limit = re.search(r'Time limit:\s*</td>\s*<td>([^<]*)', req.text)
+        memory_limit = re.search(r'Memory limit:\s*</td>\s*<td>([^<]*)', req.text)
+        return self.parse_limits(time_limit and time_limit.group(1),
+                                 memory_limit and memory_limit.group(1))
+
+    def parse_soup(self, req):
         """
         Method to parse the html and get test cases
         from a spoj problem
@@ -691,10 +3928,7 @@ class Spoj(Platform):
         test_cases = soup.findAll('pre')
 
         if test_cases is None or len(test_cases) == 0:
-            print('Problem not found..')
-            Utilities.handle_kbd_interrupt(
-                self.site, self.contest, self.problem)
-            sys.exit(0)
+            self.problem_not_found()
 
         formatted_inputs, formatted_outputs = [], []
 
@@ -718,13 +3952,15 @@ class Spoj(Platform):
             inp = re.sub('<[^<]+?>', '', inp)
             out = re.sub('<[^<]+?>', '', out)
 
-            formatted_inputs += [inp.strip()]
-            formatted_outputs += [out.strip()]
+            formatted_inputs += [html.unescape(inp).strip()]
+            formatted_outputs += [html.unescape(out).strip()]
+
+        limits = self.find_limits(req)
 
         # print 'Inputs', formatted_inputs
         # print 'Outputs', formatted_outputs
 
-        return formatted_inputs, formatted_outputs
+        return formatted_inputs, formatted_outputs, limits
 
     def build_problem_url(self):
         return 'http://spoj.com/problems/%s' % self.problem
@@ -740,7 +3976,31 @@ class Hackerrank(Platform):
                                 ).lower() if args['problem'] is not None else None
         super(Hackerrank, self).__init__(args)
 
-    def parse_html(self, req):
+    def extract_samples(self, req):
+        """
+        Method to get test cases from a hackerrank problem in a single pass
+        """
+        try:
+            page = SampleExtractor.extract(json.loads(req.text)['model']['body_html'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        formatted_inputs, formatted_outputs = [], []
+
+        for block in page.select('challenge_sample_input'):
+            text = '\n'.join(block['spans']) if len(block['spans']) > 0 else block['text']
+            formatted_inputs += [text.strip()]
+
+        for block in page.select('challenge_sample_output'):
+            text = '\n'.join(block['spans']) if len(block['spans']) > 0 else block['text']
+            formatted_outputs += [text.strip()]
+
+        if len(formatted_inputs) == 0 and len(formatted_outputs) == 0:
+            return None
+
+        return formatted_inputs, formatted_outputs, {}
+
+    def parse_soup(self, req):
         """
         Method to parse the html and get test cases
         from a hackerrank problem
@@ -750,10 +4010,7 @@ class Hackerrank(Platform):
             data = json.loads(req.text)
             soup = bs(data['model']['body_html'], 'html.parser')
         except (KeyError, ValueError):
-            print('Problem not found..')
-            Utilities.handle_kbd_interrupt(
-                self.site, self.contest, self.problem)
-            sys.exit(0)
+            self.problem_not_found()
 
         input_divs = soup.findAll('div', {'class': 'challenge_sample_input'})
         output_divs = soup.findAll('div', {'class': 'challenge_sample_output'})
@@ -778,7 +4035,7 @@ class Hackerrank(Platform):
             else:
                 formatted_input = regex.sub('', str(inp))
 
-            formatted_inputs += [formatted_input.strip()]
+            formatted_inputs += [html.unescape(formatted_input).strip()]
 
         for out in outputs:
             spans = out.findAll('span')
@@ -788,12 +4045,13 @@ class Hackerrank(Platform):
             else:
                 formatted_output = regex.sub('', str(out))
 
-            formatted_outputs += [formatted_output.strip()]
+            formatted_outputs += [html.unescape(formatted_output).strip()]
 
         # print 'Inputs', formatted_inputs
         # print 'Outputs', formatted_outputs
 
-        return formatted_inputs, formatted_outputs
+        # Limits depend on the language and are not part of the challenge
+        return formatted_inputs, formatted_outputs, {}
 
     def get_problem_links(self, req):
         """
@@ -831,7 +4089,35 @@ class AtCoder(Platform):
         self.problem = args['problem']
         super(AtCoder, self).__init__(args)
 
-    def parse_html(self, req):
+    def extract_samples(self, req):
+        """
+        Method to get test cases from a atcoder problem in a single pass
+        """
+        page = SampleExtractor.extract(req.text, collect_text=True)
+
+        formatted_inputs, formatted_outputs = [], []
+
+        for block in page.select('part'):
+            if block['heading'][:3] == "入力例":
+                formatted_inputs += [block['text']]
+            if block['heading'][:3] == "出力例":
+                formatted_outputs += [block['text']]
+
+        if len(formatted_inputs) == 0 and len(formatted_outputs) == 0:
+            return None
+
+        return formatted_inputs, formatted_outputs, self.find_limits(page.get_text())
+
+    def find_limits(self, text):
+        """
+        Method to get the limits from the text of a atcoder problem
+        """
+        time_limit = re.search(r'(?:Time Limit|実行時間制限)\s*:\s*([\d.]+\s*m?sec)', text)
+        memory_limit = re.search(r'(?:Memory Limit|メモリ制限)\s*:\s*([\d.]+\s*[KMG]i?B)', text)
+        return self.parse_limits(time_limit and time_limit.group(1),
+                                 memory_limit and memory_limit.group(1))
+
+    def parse_soup(self, req):
         """
         Method to parse the html and get test cases
         from a atcoder problem
@@ -851,20 +4137,14 @@ class AtCoder(Platform):
                 pre = inp.find('pre').decode_contents()
                 pre = functools.reduce(lambda a, kv: a.replace(*kv), repls, pre)
                 pre = re.sub('<[^<]+?>', '', pre)
-                pre = pre.replace("&amp;", "&")
-                pre = pre.replace("&lt;", "<")
-                pre = pre.replace("&gt;", ">")
-                formatted_inputs += [pre]
+                formatted_inputs += [html.unescape(pre)]
             if inp.find('section').find('h3').text[:3] == "出力例":
                 pre = inp.find('pre').decode_contents()
                 pre = functools.reduce(lambda a, kv: a.replace(*kv), repls, pre)
                 pre = re.sub('<[^<]+?>', '', pre)
-                pre = pre.replace("&amp;", "&")
-                pre = pre.replace("&lt;", "<")
-                pre = pre.replace("&gt;", ">")
-                formatted_outputs += [pre]
+                formatted_outputs += [html.unescape(pre)]
 
-        return formatted_inputs, formatted_outputs
+        return formatted_inputs, formatted_outputs, self.find_limits(soup.get_text())
 
     def get_problem_links(self, req):
         """
@@ -881,8 +4161,12 @@ class AtCoder(Platform):
                 self.site, self.contest, self.problem)
             sys.exit(0)
 
-        links = ['http://beta.atcoder.jp' +
-                 td.find('a')['href'] for td in soup.findAll('td', {'class': 'text-center no-break'})]
+        links = []
+        for td in soup.findAll('td', {'class': 'text-center no-break'}):
+            link = 'http://beta.atcoder.jp' + td.find('a')['href']
+            # Named like get_problem_name does, so that pages need not be parsed twice
+            self.problem_names[link] = td.find('a').get_text().strip().lower()
+            links += [link]
 
         return links
 
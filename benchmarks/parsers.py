@@ -0,0 +1,281 @@
+# coding: utf-8
+"""
+Benchmark of the parsers of ACedIt
+
+Runs parse_html and get_problem_links of every platform over a corpus of
+pages, and reports pages/sec, MB/sec and peak memory for each of them.
+The corpus is generated, once with small samples and once with samples of
+--sample-kb kilobytes, and can be extended with archives recorded with
+`acedit --record`.
+
+usage: python benchmarks/parsers.py [--archive ARCHIVE] [--sample-kb SAMPLE_KB]
+                                    [--repeat REPEAT] [--output OUTPUT]
+                                    [--compare BASELINE]
+"""
+import gzip
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from acedit.util import AtCoder, Codechef, Codeforces, Hackerrank, Page, Spoj, Utilities
+
+
+def make_sample(size):
+    """
+    Function to make the text of a sample of about size bytes
+    """
+    line = '1000000000 999999999 123456789 42\n'
+    return line * max(1, size // len(line))
+
+
+def make_pages(sample_size, num_samples=3, num_problems=8):
+    """
+    Function to generate a page in the format of each parser
+    Returns a dict from parser name to pages
+    """
+    sample = make_sample(sample_size)
+    pages = {}
+
+    html_sample = sample.replace('\n', '<br/>')
+    pages['codeforces.parse_html'] = [Page(
+        'http://codeforces.com/contest/1/problem/A',
+        '<html><body><div class="problem-statement">'
+        '<div class="time-limit">time limit per test2 seconds</div>'
+        '<div class="memory-limit">memory limit per test256 megabytes</div>' +
+        ''.join('<div class="input"><div class="title">Input</div><pre>%s</pre></div>'
+                '<div class="output"><div class="title">Output</div><pre>%s</pre></div>'
+                % (html_sample, html_sample) for _ in range(num_samples)) +
+        '</div></body></html>', 200)]
+    pages['codeforces.get_problem_links'] = [Page(
+        'http://codeforces.com/contest/1',
+        '<html><body><table class="problems">' +
+        ''.join('<tr><td class="id"><a href="/contest/1/problem/%s">%s</a></td></tr>'
+                % (chr(65 + i), chr(65 + i)) for i in range(num_problems)) +
+        '</table></body></html>', 200)]
+
+    body = ''.join('### Example Input\n```\n%s```\n### Example Output\n```\n%s```\n'
+                   % (sample, sample) for _ in range(num_samples))
+    pages['codechef.parse_html'] = [Page(
+        'https://codechef.com/api/contests/X/problems/A',
+        json.dumps({'body': body, 'max_timelimit': '1'}), 200)]
+    pages['codechef._extract'] = [Page(
+        'https://codechef.com/api/contests/X/problems/A', body, 200)]
+    pages['codechef.get_problem_links'] = [Page(
+        'https://codechef.com/X',
+        '<html><body><table class="dataTable">' +
+        ''.join('<tr><td><div class="problemname"><a href="/X/problems/P%d">P%d</a></div></td></tr>'
+                % (i, i) for i in range(num_problems)) +
+        '</table></body></html>', 200)]
+
+    pages['spoj.parse_html'] = [Page(
+        'http://spoj.com/problems/A',
+        '<html><body><table><tr><td>Time limit:</td><td>1s</td></tr>'
+        '<tr><td>Memory limit:</td><td>1536MB</td></tr></table>' +
+        ''.join('<pre><b>Input:</b>\n%s\n<b>Output:</b>\n%s</pre>' % (sample, sample)
+                for _ in range(num_samples)) +
+        '</body></html>', 200)]
+
+    body_html = ''.join('<div class="challenge_sample_input"><pre><code>%s</code></pre></div>'
+                        '<div class="challenge_sample_output"><pre><code>%s</code></pre></div>'
+                        % (sample, sample) for _ in range(num_samples))
+    pages['hackerrank.parse_html'] = [Page(
+        'https://www.hackerrank.com/rest/contests/X/challenges/a',
+        json.dumps({'model': {'body_html': body_html}}), 200)]
+    pages['hackerrank.get_problem_links'] = [Page(
+        'https://www.hackerrank.com/rest/contests/X/challenges',
+        json.dumps({'models': [{'slug': 'p%d' % i} for i in range(num_problems)]}), 200)]
+
+    pages['atcoder.parse_html'] = [Page(
+        'https://beta.atcoder.jp/contests/X/tasks/X_a',
+        '<html><head><title>A - Problem</title></head><body>'
+        '<p>Time Limit: 2 sec / Memory Limit: 1024 MB</p>' +
+        ''.join('<div class="part"><section><h3>入力例 %d</h3><pre>%s</pre></section></div>'
+                '<div class="part"><section><h3>出力例 %d</h3><pre>%s</pre></section></div>'
+                % (i + 1, sample, i + 1, sample) for i in range(num_samples)) +
+        '</body></html>', 200)]
+    pages['atcoder.get_problem_links'] = [Page(
+        'https://beta.atcoder.jp/contests/X/tasks/',
+        '<html><body><table><tbody>' +
+        ''.join('<tr><td class="text-center no-break"><a href="/contests/X/tasks/X_%s">%s</a></td></tr>'
+                % (chr(97 + i), chr(65 + i)) for i in range(num_problems)) +
+        '</tbody></table></body></html>', 200)]
+
+    return pages
+
+
+def classify(url):
+    """
+    Function to get the name of the parser for a recorded page
+    Returns None for pages of unknown sites
+    """
+    host, path = urlparse(url).netloc, urlparse(url).path.rstrip('/')
+
+    if 'codeforces' in host:
+        return 'codeforces.parse_html' if '/problem/' in path else 'codeforces.get_problem_links'
+    if 'codechef' in host:
+        return 'codechef.parse_html' if '/problems/' in path else 'codechef.get_problem_links'
+    if 'spoj' in host:
+        return 'spoj.parse_html'
+    if 'hackerrank' in host:
+        return 'hackerrank.get_problem_links' if path.endswith('/challenges') else 'hackerrank.parse_html'
+    if 'atcoder' in host:
+        return 'atcoder.get_problem_links' if path.endswith('/tasks') else 'atcoder.parse_html'
+    return None
+
+
+def load_archive(path):
+    """
+    Function to get the pages of an archive recorded with `acedit --record`
+    Returns a dict from parser name to pages
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        exchanges = json.loads(f.read())['exchanges']
+
+    pages = {}
+    for url, entry in sorted(exchanges.items()):
+        name = classify(url)
+        if name is not None and entry['status'] == 200:
+            pages.setdefault(name, []).append(Page(entry['url'], entry['text'], 200))
+    return pages
+
+
+def get_parser(name):
+    """
+    Function to get the parser function for a parser name
+    """
+    site, method = name.split('.')
+    platforms = {'codeforces': Codeforces, 'codechef': Codechef, 'spoj': Spoj,
+                 'hackerrank': Hackerrank, 'atcoder': AtCoder}
+    platform = platforms[site]({'site': site, 'contest': 'X', 'problem': 'A', 'force': False})
+
+    if method == '_extract':
+        return lambda page: (platform._extract(page.text, 'example input'),
+                             platform._extract(page.text, 'example output'))
+    return getattr(platform, method)
+
+
+def run_parser(parser, pages):
+    """
+    Function to run a parser over all pages
+    Returns the number of pages it could not parse
+    """
+    failures = 0
+    for page in pages:
+        try:
+            parser(page)
+        except SystemExit:
+            failures += 1
+    return failures
+
+
+def benchmark(name, corpus, pages, repeat):
+    """
+    Function to measure the throughput and peak memory of a parser
+    """
+    parser = get_parser(name)
+    size = sum(len(page.text.encode('utf-8')) for page in pages)
+
+    # Warm up, and measure the peak memory separately as tracing slows parsing down
+    tracemalloc.start()
+    failures = run_parser(parser, pages)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run_parser(parser, pages)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    return {
+        'parser': name,
+        'corpus': corpus,
+        'pages': len(pages),
+        'bytes': size,
+        'failures': failures,
+        'seconds': elapsed / repeat,
+        'pages_per_sec': len(pages) * repeat / elapsed,
+        'mb_per_sec': size * repeat / elapsed / 1e6,
+        'peak_memory_mb': peak / 1e6,
+    }
+
+
+def get_commit():
+    """
+    Function to get the commit the benchmark is run on, if known
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark the parsers of ACedIt')
+    parser.add_argument('--archive', action='append', default=[],
+                        help='Archive recorded with acedit --record to add to the corpus')
+    parser.add_argument('--sample-kb', type=int, default=256,
+                        help='Size of each sample of the huge generated pages, in kilobytes')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of times to parse each corpus')
+    parser.add_argument('--output',
+                        help='File to write the results to as JSON')
+    parser.add_argument('--compare',
+                        help='Results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    corpora = [('small', make_pages(1024)), ('huge', make_pages(args.sample_kb * 1024))]
+    corpora += [(os.path.basename(path), load_archive(path)) for path in args.archive]
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            for result in json.loads(f.read())['results']:
+                baseline[result['parser'], result['corpus']] = result
+
+    # Parsers remove the cached test cases of pages they cannot parse
+    Utilities.cache_dir = tempfile.mkdtemp(prefix='acedit-bench')
+
+    results = []
+    try:
+        print('%-30s %-10s %6s %10s %9s %9s %8s' % (
+            'parser', 'corpus', 'pages', 'pages/sec', 'MB/sec', 'peak MB', 'speedup'))
+        for corpus, pages in corpora:
+            for name in sorted(pages):
+                result = benchmark(name, corpus, pages[name], args.repeat)
+                results += [result]
+
+                speedup = ''
+                if (name, corpus) in baseline:
+                    speedup = '%.2fx' % (result['pages_per_sec'] / baseline[name, corpus]['pages_per_sec'])
+                print('%-30s %-10s %6d %10.1f %9.2f %9.2f %8s%s' % (
+                    name, corpus[:10], result['pages'], result['pages_per_sec'],
+                    result['mb_per_sec'], result['peak_memory_mb'], speedup,
+                    '  (%d failed)' % result['failures'] if result['failures'] else ''))
+    finally:
+        shutil.rmtree(Utilities.cache_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps({
+                'commit': get_commit(),
+                'python': platform.python_version(),
+                'sample_kb': args.sample_kb,
+                'repeat': args.repeat,
+                'results': results,
+            }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -22,6 +22,8 @@ setup(
 
     packages=['acedit'],
 
+    package_data={'acedit': ['harness/*.c', 'harness/*.java', 'harness/*.py', 'harness/*.rb']},
+
     version='1.2.1',
 
     description='Download and test against sample test cases from any competitive programming website',
@@ -36,6 +38,10 @@ setup(
 
     install_requires=requirements,
 
+    extras_require={
+        'asyncio': ['aiohttp'],
+    },
+
     entry_points={
         'console_scripts': ['acedit=acedit.main:main']
     },
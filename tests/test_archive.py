@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+from acedit.util import Archive, AsyncEngine, Utilities, aiohttp
+
+
+class RedirectHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/old':
+            self.send_response(301)
+            self.send_header('Location', '/new')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            body = b'<html>new</html>'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='acedit')
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        with open(os.path.join(self.cache_dir, 'constants.json'), 'w') as f:
+            f.write('{}')
+        patcher = mock.patch.multiple(Utilities, cache_dir=self.cache_dir, index=None,
+                                      archive=None, sessions={}, rate_limiters={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        server = HTTPServer(('127.0.0.1', 0), RedirectHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base = 'http://127.0.0.1:%d' % server.server_port
+        self.path = os.path.join(self.cache_dir, 'archive.json.gz')
+
+    def reset(self, archive):
+        """
+        Method to start with fresh sessions, so that responses come from the archive
+        """
+        Utilities.close_archive()
+        Utilities.sessions.clear()
+        Utilities.rate_limiters.clear()
+        Utilities.archive = archive
+
+    def record_with_threads(self):
+        self.reset(Archive(self.path, False))
+        r = Utilities.get_html(self.base + '/old')
+        self.assertEqual(r.text, '<html>new</html>')
+        Utilities.close_archive()
+
+    def test_replay_redirect_with_threads(self):
+        self.record_with_threads()
+
+        self.reset(Archive(self.path, True))
+        r = Utilities.get_html(self.base + '/old')
+        self.assertEqual((r.url, r.status_code, r.text), (self.base + '/new', 200, '<html>new</html>'))
+
+    @unittest.skipUnless(aiohttp, 'aiohttp is not installed')
+    def test_replay_redirect_with_asyncio(self):
+        self.record_with_threads()
+
+        self.reset(Archive(self.path, True))
+        engine = AsyncEngine(None)
+        page, headers = engine.run(engine.download_page(self.base + '/old'))
+        self.assertEqual((page.url, page.status_code, page.text), (self.base + '/new', 200, '<html>new</html>'))
+
+    def test_redirect_loop(self):
+        archive = Archive(self.path, False)
+        archive.exchanges = {
+            self.base + '/a': {'url': self.base + '/a', 'status': 302, 'headers': {'Location': '/b'}, 'text': ''},
+            self.base + '/b': {'url': self.base + '/b', 'status': 302, 'headers': {'Location': '/a'}, 'text': ''},
+        }
+        url, status, headers, text = archive.replay_redirects(self.base + '/a', {})
+        self.assertEqual(status, 302)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from acedit.util import CasePack, Page, Utilities
+
+
+class CacheIndexTest(unittest.TestCase):
+
+    url = 'http://codeforces.com/contest/1/problem/A'
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='acedit')
+        patcher = mock.patch.multiple(Utilities, cache_dir=self.cache_dir, index=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.addCleanup(lambda: Utilities.index.close() if Utilities.index is not None else None)
+
+        self.path = os.path.join(self.cache_dir, 'codeforces', '1', 'A')
+        os.makedirs(self.path)
+        Utilities.store_files('codeforces', '1', 'A', ['1\n', '2\n'], ['2\n', '4\n'], {'time_limit': 1})
+        Utilities.save_response(self.url, Page(self.url, '<html></html>', 200), {'ETag': '"v1"'},
+                                'codeforces', '1', 'A')
+
+    def touch(self):
+        """
+        Method to make sure a change to the problem directory changes its mtime
+        """
+        mtime = os.path.getmtime(self.path) + 1
+        os.utime(self.path, (mtime, mtime))
+
+    def test_cached_problem(self):
+        row = Utilities.get_cached_problem('codeforces', '1', 'A')
+        self.assertEqual(row['cases'], 2)
+        self.assertEqual(row['time_limit'], 1)
+        self.assertEqual(Utilities.get_validators(self.url), {'If-None-Match': '"v1"'})
+
+    def test_removed_directory(self):
+        shutil.rmtree(self.path)
+
+        self.assertIsNone(Utilities.get_cached_problem('codeforces', '1', 'A'))
+        with Utilities.index_lock:
+            self.assertEqual(Utilities.index.execute('SELECT COUNT(*) FROM problems').fetchone()[0], 0)
+        # The page is fetched again rather than revalidated
+        self.assertEqual(Utilities.get_validators(self.url), {})
+        self.assertFalse(Utilities.check_cache('codeforces', '1', 'A'))
+
+    def test_removed_case(self):
+        os.remove(os.path.join(self.path, 'Output1'))
+        self.touch()
+
+        row = Utilities.get_cached_problem('codeforces', '1', 'A')
+        self.assertEqual(row['cases'], 1)
+        self.assertEqual(row['time_limit'], 1)
+
+    def test_removed_cases(self):
+        for name in ['Input0', 'Input1']:
+            os.remove(os.path.join(self.path, name))
+        self.touch()
+
+        self.assertIsNone(Utilities.get_cached_problem('codeforces', '1', 'A'))
+        self.assertEqual(Utilities.get_validators(self.url), {})
+
+    def test_added_case(self):
+        fetched = Utilities.get_cached_problem('codeforces', '1', 'A')['fetched']
+        with open(os.path.join(self.path, 'Input2'), 'w') as f:
+            f.write('3\n')
+        with open(os.path.join(self.path, 'Output2'), 'w') as f:
+            f.write('6\n')
+        self.touch()
+
+        row = Utilities.get_cached_problem('codeforces', '1', 'A')
+        self.assertEqual(row['cases'], 3)
+        self.assertEqual(row['fetched'], fetched)
+        self.assertEqual(Utilities.get_validators(self.url), {'If-None-Match': '"v1"'})
+
+    def test_problem_cached_before_the_index(self):
+        path = os.path.join(self.cache_dir, 'codeforces', '1', 'B')
+        os.makedirs(path)
+        for name, case in [('Input0', '1\n'), ('Output0', '1\n')]:
+            with open(os.path.join(path, name), 'w') as f:
+                f.write(case)
+
+        row = Utilities.get_cached_problem('codeforces', '1', 'B')
+        self.assertEqual(row['cases'], 1)
+        self.assertIsNone(Utilities.get_cached_problem('codeforces', '1', 'C'))
+
+    def test_pack_cache(self):
+        with open(os.path.join(self.cache_dir, 'constants.json'), 'w') as f:
+            f.write('{}')
+        fetched = Utilities.get_cached_problem('codeforces', '1', 'A')['fetched']
+
+        Utilities.pack_cache()
+        self.assertEqual(sorted(os.listdir(self.path)), [CasePack.filename, 'meta.json'])
+        with Utilities.index_lock:
+            row = Utilities.index.execute('SELECT * FROM problems').fetchone()
+        self.assertEqual(row['stored_bytes'], Utilities.get_stored_size('codeforces', '1', 'A'))
+        self.assertEqual(row['mtime'], os.path.getmtime(self.path))
+        self.assertEqual((row['cases'], row['fetched'], row['time_limit']), (2, fetched, 1))
+        self.assertEqual(Utilities.get_validators(self.url), {'If-None-Match': '"v1"'})
+
+    def test_run_without_test_cases_after_download(self):
+        source_dir = tempfile.mkdtemp(prefix='acedit')
+        self.addCleanup(shutil.rmtree, source_dir)
+        source = os.path.join(source_dir, 'A.py')
+        with open(source, 'w') as f:
+            f.write('print(input())\n')
+        shutil.rmtree(self.path)
+
+        args = {'site': 'codeforces', 'contest': '1', 'problem': None, 'source': source}
+        # A download which stores nothing, like one answered with Not Modified
+        with mock.patch.object(Utilities, 'download_problem_testcases') as download:
+            with self.assertRaises(SystemExit):
+                Utilities.run_solution(args)
+        self.assertEqual(download.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from acedit.util import CasePack
+
+
+class CasePackTest(unittest.TestCase):
+
+    inputs = ['3\n1 2 3\n', '', '1 ' * 50000 + '\n']
+    outputs = ['6\n', '0\n', 'é\n' * 40000]
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='acedit')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write_version_1(self, inputs, outputs):
+        """
+        Method to write a pack the way version 1 did, without compression
+        """
+        cases = [case.encode('utf-8') for case in inputs + outputs]
+        entry = CasePack.entries[1]
+
+        offset = CasePack.header.size + entry.size * len(cases)
+        table = []
+        for case in cases:
+            table += [entry.pack(offset, len(case))]
+            offset += len(case)
+
+        with open(os.path.join(self.path, CasePack.filename), 'wb') as f:
+            f.write(CasePack.header.pack(CasePack.magic, 1, len(inputs), len(outputs)))
+            f.write(b''.join(table))
+            f.write(b''.join(cases))
+
+    def check_cases(self, pack, inputs, outputs):
+        self.assertEqual((pack.num_inputs, pack.num_outputs), (len(inputs), len(outputs)))
+        for kind, cases in [('Input', inputs), ('Output', outputs)]:
+            for i, case in enumerate(cases):
+                self.assertEqual(pack.read(kind, i), case)
+                self.assertEqual(b''.join(pack.chunks(kind, i)), case.encode('utf-8'))
+
+        for i, case in enumerate(inputs):
+            with pack.input_file(i) as input_file, open(input_file, 'r') as f:
+                self.assertEqual(f.read(), case)
+
+    def test_round_trip(self):
+        CasePack.write(self.path, self.inputs, self.outputs, 1024)
+        with CasePack.open(self.path) as pack:
+            compressed = [compressed for _, _, compressed in pack.table]
+            self.assertEqual(compressed, [False, False, True, False, False, True])
+            self.check_cases(pack, self.inputs, self.outputs)
+
+    def test_round_trip_without_compression(self):
+        CasePack.write(self.path, self.inputs, self.outputs, 1 << 30)
+        with CasePack.open(self.path) as pack:
+            self.assertFalse(any(compressed for _, _, compressed in pack.table))
+            self.check_cases(pack, self.inputs, self.outputs)
+
+    def test_incompressible_case_is_stored_as_is(self):
+        generator = random.Random(1)
+        case = ''.join(chr(generator.randrange(33, 127)) for i in range(256))
+        CasePack.write(self.path, [case], [case], 0)
+        with CasePack.open(self.path) as pack:
+            self.assertEqual([compressed for _, _, compressed in pack.table], [False, False])
+            self.check_cases(pack, [case], [case])
+
+    def test_version_1(self):
+        self.write_version_1(self.inputs, self.outputs)
+        with CasePack.open(self.path) as pack:
+            self.assertFalse(any(compressed for _, _, compressed in pack.table))
+            self.check_cases(pack, self.inputs, self.outputs)
+
+    def test_rewrite_replaces_pack(self):
+        CasePack.write(self.path, self.inputs, self.outputs, 1024)
+        CasePack.write(self.path, ['1\n'], ['2\n'], 1024)
+        with CasePack.open(self.path) as pack:
+            self.check_cases(pack, ['1\n'], ['2\n'])
+        self.assertEqual(os.listdir(self.path), [CasePack.filename])
+
+    def test_no_pack(self):
+        self.assertIsNone(CasePack.open(self.path))
+
+    def test_not_a_pack(self):
+        with open(os.path.join(self.path, CasePack.filename), 'wb') as f:
+            f.write(CasePack.header.pack(b'ACPX', CasePack.version, 0, 0))
+        with self.assertRaises(ValueError):
+            CasePack.open(self.path)
+
+        with open(os.path.join(self.path, CasePack.filename), 'wb') as f:
+            f.write(CasePack.header.pack(CasePack.magic, CasePack.version + 1, 0, 0))
+        with self.assertRaises(ValueError):
+            CasePack.open(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from acedit.util import Utilities
+
+
+def split(data, size):
+    """
+    Function to cut an output into chunks of a given size
+    """
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TokenizeTest(unittest.TestCase):
+
+    output = b'12 345\n  6789\t0\n\nlast line\n'
+
+    def test_tokens_do_not_depend_on_chunking(self):
+        expected = self.output.split()
+        for size in range(1, len(self.output) + 1):
+            tokens = [token for tokens in Utilities.tokenize(split(self.output, size)) for token in tokens]
+            self.assertEqual(tokens, expected, 'chunks of %d bytes' % size)
+
+    def test_token_at_end_of_output(self):
+        self.assertEqual(list(Utilities.tokenize([b'1 2', b'3'])), [[b'1'], [b'23']])
+        self.assertEqual(list(Utilities.tokenize([])), [])
+        self.assertEqual(list(Utilities.tokenize([b' \n', b'\t'])), [])
+
+
+class LocateTokenTest(unittest.TestCase):
+
+    output = b'12 345\n  6789\t0\n\nlast line\n'
+    positions = [(1, 1), (1, 4), (2, 3), (2, 8), (4, 1), (4, 6)]
+
+    def test_positions_do_not_depend_on_chunking(self):
+        for size in range(1, len(self.output) + 1):
+            chunks = split(self.output, size)
+            for index, position in enumerate(self.positions):
+                self.assertEqual(Utilities.locate_token(chunks, index), position,
+                                 'token %d in chunks of %d bytes' % (index, size))
+
+    def test_past_the_last_token(self):
+        self.assertIsNone(Utilities.locate_token(split(self.output, 4), len(self.positions)))
+        self.assertIsNone(Utilities.locate_token([], 0))
+
+
+class CompareOutputsTest(unittest.TestCase):
+
+    def compare(self, expected, found, size=3, **kwargs):
+        return Utilities.compare_outputs(lambda: split(expected, size), lambda: split(found, size), **kwargs)
+
+    def test_same_tokens(self):
+        self.assertIsNone(self.compare(b'1 2\n3\n', b'1 2\n3\n'))
+        self.assertIsNone(self.compare(b'1 2\n3\n', b'1  2 \r\n3'))
+        self.assertIsNone(self.compare(b'', b'\n\n'))
+
+    def test_first_difference(self):
+        for size in range(1, 12):
+            self.assertEqual(self.compare(b'1 2\n3 4\n5\n', b'1 2\n3 40\n5\n', size),
+                             'Line 2, column 3: expected 4, found 40')
+
+    def test_different_lengths(self):
+        self.assertEqual(self.compare(b'1 2\n3\n', b'1 2\n'),
+                         'Line 2, column 1: expected 3, found end of output')
+        self.assertEqual(self.compare(b'1\n', b'1\n  2\n'),
+                         'Line 2, column 3: expected end of output, found 2')
+
+    def test_allowed_error(self):
+        self.assertIsNone(self.compare(b'0.5 1\n', b'0.5001 1\n', abs_error=1e-3))
+        self.assertIsNotNone(self.compare(b'0.5 1\n', b'0.51 1\n', abs_error=1e-3))
+        self.assertIsNone(self.compare(b'1000\n', b'1000.5\n', rel_error=1e-3))
+        self.assertIsNotNone(self.compare(b'abc\n', b'abd\n', abs_error=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+
+from acedit.util import RateLimiter
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch('time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_rate(self):
+        limiter = RateLimiter(2, 4)
+        self.assertEqual(limiter.take(), 0)
+        self.assertEqual(limiter.take(), 0)
+        self.assertAlmostEqual(limiter.take(), 0.25)
+
+        self.now += 0.125
+        self.assertAlmostEqual(limiter.take(), 0.125)
+        self.now += 0.125
+        self.assertEqual(limiter.take(), 0)
+
+    def test_tokens_do_not_pile_up(self):
+        limiter = RateLimiter(2, 4)
+        self.now += 60
+        self.assertEqual(limiter.take(), 0)
+        self.assertEqual(limiter.take(), 0)
+        self.assertGreater(limiter.take(), 0)
+
+    def test_overloaded_host_pauses_and_slows_down(self):
+        limiter = RateLimiter(4, 4)
+        limiter.update(503, {'Retry-After': '2'})
+        self.assertEqual(limiter.rate, 2)
+        self.assertAlmostEqual(limiter.take(), 2)
+
+        self.now += 2
+        self.assertEqual(limiter.take(), 0)
+
+    def test_rate_recovers_up_to_its_limit(self):
+        limiter = RateLimiter(4, 4)
+        limiter.update(429, {})
+        limiter.update(429, {})
+        self.assertEqual(limiter.rate, 1)
+        for _ in range(10):
+            limiter.update(200, {})
+        self.assertEqual(limiter.rate, 4)
+
+    def test_retry_after(self):
+        self.assertEqual(RateLimiter.get_retry_after({}), 1)
+        self.assertEqual(RateLimiter.get_retry_after({'Retry-After': '5'}), 5)
+        self.assertEqual(RateLimiter.get_retry_after({'Retry-After': '-5'}), 0)
+        self.assertEqual(RateLimiter.get_retry_after({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}), 0)
+        self.assertEqual(RateLimiter.get_retry_after({'Retry-After': 'soon'}), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()